@@ -0,0 +1,553 @@
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import main
+
+
+# Function to build a reproducible batch of utterances out of lexicon and filler words
+def make_texts(count, words_per_text=12, seed=0):
+    rng = random.Random(seed)
+    vocabulary = sorted(main.GI_index)[:5000] + ["i", "feel", "the", "and", "today", "very", "not", "so"] * 300
+    return [" ".join(rng.choice(vocabulary) for _ in range(words_per_text)) + "." for _ in range(count)]
+
+# Function to time a callable, keeping the best of a few repeats
+def best_time(function, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Per-text loop against the vectorized batch engine, for growing batch sizes
+def bench_batch(args):
+    print("{:>8} {:>14} {:>14} {:>8}".format("texts", "loop (ms)", "batch (ms)", "speedup"))
+    crossover = None
+    for count in [1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384]:
+        token_lists = [main.tokenize_text(text)[2] for text in make_texts(count, args.words)]
+
+        def loop():
+            for tokens in token_lists:
+                main.run_nrc(tokens, [], [])
+
+        loop_time = best_time(loop)
+        batch_time = best_time(lambda: main.score_batch(token_lists))
+        if crossover is None and batch_time < loop_time:
+            crossover = count
+        print("{:>8} {:>14.3f} {:>14.3f} {:>7.2f}x".format(count, loop_time * 1000, batch_time * 1000,
+                                                          loop_time / batch_time))
+    print("crossover at {} texts (BATCH_VECTORIZE_THRESHOLD = {})".format(crossover, main.BATCH_VECTORIZE_THRESHOLD))
+
+# Cost of scoring every GI category against the ten NRC emotions, on both scoring paths
+def bench_categories(args):
+    token_lists = [main.tokenize_text(text)[2] for text in make_texts(2000, args.words)]
+    print("{:>12} {:>8} {:>14} {:>14}".format("categories", "count", "loop (ms)", "batch (ms)"))
+    for name, selection in [("nrc", None), ("all", "all")]:
+        categories = main.resolve_categories(selection)
+        category_ids = [main.GI_category_ids[key] for key in categories]
+
+        def loop():
+            for tokens in token_lists:
+                main.score_tokens(tokens, category_ids)
+
+        print("{:>12} {:>8} {:>14.3f} {:>14.3f}".format(name, len(categories), best_time(loop) * 1000,
+                                                        best_time(lambda: main.score_batch(token_lists, categories)) * 1000))
+
+# Cold start: import time of main in a fresh interpreter, then the load cost of each resource. Load times
+# come from a run without memory tracking, memory from a second run with SPEAKBRIGHT_TRACK_MEMORY=1.
+def bench_startup(args):
+    code = ("import time; start = time.perf_counter(); import main; imported = time.perf_counter() - start; "
+            "import json; print(json.dumps({'import': imported, 'resources': main.warm_up()}))")
+    reports = []
+    for track_memory in ["0", "1"]:
+        env = dict(os.environ, SPEAKBRIGHT_TRACK_MEMORY=track_memory)
+        reports.append(json.loads(subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                                                 capture_output=True, text=True).stdout))
+    report, tracked = reports
+    print("import main: {:.1f} ms".format(report["import"] * 1000))
+    print("{:>16} {:>12} {:>12}".format("resource", "load (ms)", "memory (KB)"))
+    for name, stats in report["resources"].items():
+        if stats["loaded"]:
+            print("{:>16} {:>12.1f} {:>12.0f}".format(name, stats["load_time"] * 1000,
+                                                     (tracked["resources"][name]["memory"] or 0) / 1024))
+
+# Import-time budget of the VADER module: it must stay a light, stdlib-only import
+VADER_IMPORT_BUDGET_MS = 20
+VADER_FORBIDDEN_IMPORTS = ("requests", "urllib3", "numpy", "nltk")
+
+# Function to import a module under python -X importtime and return the (module, cumulative us) of it
+# and of everything it imported, the module itself last (best of three runs)
+def import_times(module):
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # measure with cached bytecode, as a deployed worker would
+    runs = []
+    for _ in range(3):
+        stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module], env=env,
+                                check=True, capture_output=True, text=True).stderr
+        lines = [line.split("|") for line in stderr.splitlines()
+                 if line.startswith("import time:") and "cumulative" not in line]
+        # Nested imports are indented and reported before their parent: the module's own imports are the
+        # lines after the previous top-level import (site and its .pth hooks come first)
+        start = len(lines) - 1
+        while start > 0 and lines[start - 1][2].startswith("  "):
+            start -= 1
+        runs.append([(name.strip(), int(cumulative)) for _, cumulative, name in lines[start:]])
+    return min(runs, key=lambda imports: imports[-1][1])
+
+# python -X importtime budget for the VADER module; fails (exit status 1) when over budget or when it
+# pulls in a network or numeric library
+def bench_importtime(args):
+    imports = import_times("data_files.vaderSentiment")
+    total_ms = imports[-1][1] / 1000
+    names = [name for name, _ in imports]
+    forbidden = sorted(set(name.split(".")[0] for name in names) & set(VADER_FORBIDDEN_IMPORTS))
+    print("import data_files.vaderSentiment: {:.1f} ms (budget {} ms), {} modules".format(
+        total_ms, VADER_IMPORT_BUDGET_MS, len(names)))
+    for name, cumulative in sorted(imports[:-1], key=lambda item: -item[1])[:5]:
+        print("{:>32} {:>8.1f} ms".format(name, cumulative / 1000))
+    if forbidden:
+        print("forbidden imports: {}".format(", ".join(forbidden)))
+    return total_ms <= VADER_IMPORT_BUDGET_MS and not forbidden
+
+# Response encoding: the old serialize -> parse -> serialize round trip against a single encode
+def bench_encode(args):
+    import responses
+
+    texts = make_texts(5000, args.words)
+    rows = main.score_text_rows(texts)
+    header_list = main.result_headers()
+    records = main.score_text_list(texts)
+
+    def round_trip():
+        json.dumps(json.loads(json.dumps(records, indent=4)), ensure_ascii=False, separators=(",", ":"))
+
+    print("{:>28} {:>10} {:>10}".format("path", "ms", "KB"))
+    print("{:>28} {:>10.1f} {:>10.0f}".format("round trip (indent=4)", best_time(round_trip) * 1000,
+                                              len(json.dumps(records, indent=4)) / 1024))
+    shapes = [(response_format, "json") for response_format in responses.RESPONSE_FORMATS] + [("columnar", "base64")]
+    for response_format, encoding in shapes:
+        def encode():
+            content = responses.format_results([dict(row) for row in rows], header_list, response_format, encoding)
+            return responses.dumps(content)
+
+        print("{:>28} {:>10.1f} {:>10.0f}".format(
+            "{}/{} ({})".format(response_format, encoding, "orjson" if responses.orjson else "json"),
+            best_time(encode) * 1000, len(encode()) / 1024))
+    binary = responses.build_response([dict(row) for row in rows], header_list, "columnar", "binary")
+    print("{:>28} {:>10} {:>10.0f}".format("columnar/binary", "", len(binary.body) / 1024))
+
+# Function to build a reproducible utterance out of VADER lexicon words, boosters, negations and filler
+def make_vader_text(analyzer, tokens, seed=0):
+    rng = random.Random(seed)
+    vocabulary = sorted(analyzer.lexicon)[:3000] + ["very", "not", "but", "kind", "of", "the", "least", "never"] * 100
+    return " ".join(rng.choice(vocabulary) + rng.choice(["", "", "", ",", "!", "."]) for _ in range(tokens))
+
+# VADER polarity_scores on utterances of growing length: time per token should stay flat
+def bench_vader(args):
+    analyzer = main.registry.get("vader_analyzer")
+    print("{:>8} {:>12} {:>14}".format("tokens", "ms/text", "us/token"))
+    for tokens in [10, 100, 1000, 10000]:
+        text = make_vader_text(analyzer, tokens)
+        elapsed = best_time(lambda: analyzer.polarity_scores(text), repeat=3)
+        print("{:>8} {:>12.3f} {:>14.2f}".format(tokens, elapsed * 1000, elapsed / tokens * 1e6))
+
+# Frozen VADER outputs (neg, neu, pos, compound). The cases marked "changed" are the two position fixes of
+# the linear polarity_scores (repeated words, equal valences around "but"), with their former "before" scores
+VADER_REGRESSION_PATH = 'data_files/vader_regression.json'
+
+# Regression check of VADER against the frozen outputs, through polarity_scores, polarity_scores_batch and
+# the VADER columns of score_text_rows; fails (exit status 1) when any score differs
+def bench_vader_regression(args):
+    with open(VADER_REGRESSION_PATH, encoding="utf-8") as f:
+        cases = json.load(f)
+    analyzer = main.registry.get("vader_analyzer")
+    texts = [case["text"] for case in cases]
+    single = [[scores[column] for column in ("neg", "neu", "pos", "compound")]
+              for scores in map(analyzer.polarity_scores, texts)]
+    batch = analyzer.polarity_scores_batch(texts).tolist()
+    shared = [row["data"][-4:] for row in main.score_text_rows(texts, vader=True)]
+    failures = 0
+    for case, *outputs in zip(cases, single, batch, shared):
+        for path, scores in zip(("polarity_scores", "polarity_scores_batch", "score_text_rows"), outputs):
+            if scores != case["scores"]:
+                failures += 1
+                print("{}({!r}): {} (expected {})".format(path, case["text"], scores, case["scores"]))
+    print("{} cases, {} changed by the position fixes, {} mismatches".format(
+        len(cases), sum("changed" in case for case in cases), failures))
+    return failures == 0
+
+# Per-text VADER polarity_scores against polarity_scores_batch, for growing batch sizes
+def bench_vader_batch(args):
+    analyzer = main.registry.get("vader_analyzer")
+    print("{:>8} {:>14} {:>14} {:>8}".format("texts", "loop (ms)", "batch (ms)", "speedup"))
+    for count in [10, 100, 1000, 10000]:
+        texts = [make_vader_text(analyzer, args.words, seed) for seed in range(count)]
+        loop = best_time(lambda: [analyzer.polarity_scores(text) for text in texts], repeat=3)
+        batch = best_time(lambda: analyzer.polarity_scores_batch(texts), repeat=3)
+        print("{:>8} {:>14.2f} {:>14.2f} {:>7.1f}x".format(count, loop * 1000, batch * 1000, loop / batch))
+
+# Cost of the VADER columns: emotion scores alone, emotion + VADER on the shared tokenization,
+# and the two separate pipelines (score_text_rows, then polarity_scores on every raw text)
+def bench_combined(args):
+    analyzer = main.registry.get("vader_analyzer")
+    print("{:>8} {:>14} {:>16} {:>16}".format("texts", "emotion (ms)", "+ vader (ms)", "separate (ms)"))
+    for count in [100, 1000, 10000]:
+        texts = make_texts(count, args.words)
+        emotion = best_time(lambda: main.score_text_rows(texts), repeat=3)
+        combined = best_time(lambda: main.score_text_rows(texts, vader=True), repeat=3)
+        separate = best_time(lambda: (main.score_text_rows(texts), [analyzer.polarity_scores(text) for text in texts]),
+                             repeat=3)
+        print("{:>8} {:>14.2f} {:>16.2f} {:>16.2f}".format(count, emotion * 1000, combined * 1000, separate * 1000))
+
+# VADER scoring with a growing number of custom idioms: the phrase trie keeps the cost per text flat
+def bench_idioms(args):
+    from data_files.vaderSentiment import SentimentIntensityAnalyzer
+
+    analyzer = main.registry.get("vader_analyzer")
+    texts = [make_vader_text(analyzer, args.words, seed) for seed in range(2000)]
+    words = sorted(analyzer.lexicon)
+    print("{:>8} {:>12}".format("idioms", "us/text"))
+    for count in [0, 100, 1000, 10000]:
+        rng = random.Random(count)
+        idioms = {"{} {}".format(rng.choice(words), rng.choice(words)): rng.uniform(-3, 3) for _ in range(count)}
+        custom = SentimentIntensityAnalyzer(lexicon=analyzer.lexicon, emojis=analyzer.emojis, idioms=idioms)
+        elapsed = best_time(lambda: [custom.polarity_scores(text) for text in texts], repeat=3)
+        print("{:>8} {:>12.2f}".format(count, elapsed / len(texts) * 1e6))
+
+# Function to build a reproducible emoji-heavy social media post: words, standalone emojis and
+# emojis glued to words or to each other
+def make_emoji_text(analyzer, tokens, seed=0):
+    rng = random.Random(seed)
+    words = sorted(analyzer.lexicon)[:3000] + ["lol", "the", "so", "today", "omg"] * 100
+    emojis = sorted(analyzer.emojis)
+    pieces = []
+    for _ in range(tokens):
+        kind = rng.random()
+        if kind < 0.6:
+            pieces.append(rng.choice(words))
+        elif kind < 0.8:
+            pieces.append(rng.choice(emojis))
+        elif kind < 0.9:
+            pieces.append(rng.choice(words) + rng.choice(emojis))
+        else:
+            pieces.append(rng.choice(emojis) * rng.randint(2, 4))
+    return " ".join(pieces)
+
+# Emoji substitution on emoji-heavy posts: the old whole-token dict lookup against the emoji matcher
+# (which also finds emojis inside tokens), and the resulting polarity_scores cost per text
+def bench_emoji(args):
+    analyzer = main.registry.get("vader_analyzer")
+    emojis = analyzer.emojis
+    matcher = analyzer.emoji_matcher
+    texts = [make_emoji_text(analyzer, args.words, seed) for seed in range(2000)]
+
+    def token_lookup():
+        return [" ".join([emojis[token] if token in emojis else token for token in text.split()]) for text in texts]
+
+    print("{:>20} {:>10} {:>16}".format("", "us/text", "emojis replaced"))
+    print("{:>20} {:>10.2f} {:>16}".format("whole-token lookup", best_time(token_lookup) / len(texts) * 1e6,
+                                           sum(token in emojis for text in texts for token in text.split())))
+    print("{:>20} {:>10.2f} {:>16}".format("emoji matcher", best_time(lambda: [matcher.replace(text) for text in texts])
+                                           / len(texts) * 1e6, sum(len(matcher.find(text)) for text in texts)))
+    print("{:>20} {:>10.2f}".format("polarity_scores", best_time(lambda: [analyzer.polarity_scores(text) for text in texts],
+                                                                 repeat=3) / len(texts) * 1e6))
+
+# VADER tokenization (SentiText) on chat-length texts: time, peak allocated memory and GC churn per call
+def bench_sentitext(args):
+    from data_files.vaderSentiment import SentiText
+
+    analyzer = main.registry.get("vader_analyzer")
+    texts = [make_vader_text(analyzer, tokens, seed) for seed, tokens in enumerate([5, 10, 20, 40] * 250)]
+    elapsed = best_time(lambda: [SentiText(text) for text in texts])
+
+    tracemalloc.start()
+    peak = 0
+    for text in texts:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        SentiText(text)
+        peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    collections = gc.get_stats()[0]["collections"]
+    for _ in range(10):
+        for text in texts:
+            SentiText(text)
+    collections = gc.get_stats()[0]["collections"] - collections
+
+    print("{:>12} {:>16} {:>22}".format("us/call", "peak bytes/call", "gen0 GCs per 1k calls"))
+    print("{:>12.2f} {:>16.0f} {:>22.2f}".format(elapsed / len(texts) * 1e6, peak / len(texts),
+                                                 collections * 1000 / (10 * len(texts))))
+
+# Memory kept by successive VADER analyzers built from the lexicon files, with and without the
+# std-dev/ratings columns. Later instances share the interned words and valences of the first.
+def bench_vader_memory(args):
+    from data_files.vaderSentiment import SentimentIntensityAnalyzer
+
+    print("{:>10} {:>14} {:>14} {:>14}".format("columns", "#1 (KB)", "#2 (KB)", "#3 (KB)"))
+    for columns in [False, True]:
+        analyzers, sizes = [], []
+        gc.collect()
+        tracemalloc.start()
+        for _ in range(3):
+            before = tracemalloc.get_traced_memory()[0]
+            analyzers.append(SentimentIntensityAnalyzer(lexicon_columns=columns))
+            gc.collect()
+            sizes.append((tracemalloc.get_traced_memory()[0] - before) / 1024)
+        tracemalloc.stop()
+        print("{:>10} {:>14.0f} {:>14.0f} {:>14.0f}".format(str(columns), *sizes))
+
+# Live transcripts: rescoring the growing transcript after every recognized word against the
+# incremental StreamingScorer (whole session and a 200-word window), per word and in total
+def bench_streaming(args):
+    from streaming import StreamingScorer
+
+    words = " ".join(make_vader_text(main.registry.get("vader_analyzer"), 2000, seed) for seed in range(5)).split()
+    print("{:>8} {:>18} {:>18} {:>18}".format("words", "rescore (us/word)", "stream (us/word)", "window (us/word)"))
+    for count in [100, 1000, 10000]:
+        session = words[:count]
+
+        def rescore():
+            for end in range(1, len(session) + 1):
+                main.score_text_rows([" ".join(session[:end])], vader=True)
+
+        def stream(window_words=None):
+            scorer = StreamingScorer(vader=True, window_words=window_words)
+            for word in session:
+                scorer.append(word)
+
+        rescore_time = best_time(rescore, repeat=1) if count <= 1000 else None
+        print("{:>8} {:>18} {:>18.1f} {:>18.1f}".format(
+            count, "{:.1f}".format(rescore_time / count * 1e6) if rescore_time is not None else "-",
+            best_time(stream, repeat=3) / count * 1e6, best_time(lambda: stream(200), repeat=3) / count * 1e6))
+
+# Repeated utterances: scoring every text against scoring through the result cache, on traffic where a
+# few short utterances make up most of the texts (Zipf-distributed over 2000 distinct texts). "cold" starts
+# from an empty cache, "warm" from the cache left by an earlier batch of the same traffic.
+def bench_cache(args):
+    from result_cache import ResultCache
+
+    distinct = make_texts(2000, args.words)
+    rng = random.Random(0)
+    weights = [1 / rank for rank in range(1, len(distinct) + 1)]
+    print("{:>8} {:>8} {:>14} {:>14} {:>14} {:>10}".format("texts", "vader", "uncached (ms)", "cold (ms)",
+                                                           "warm (ms)", "hit rate"))
+    for vader in [False, True]:
+        for count in [100, 1000, 10000]:
+            texts = rng.choices(distinct, weights, k=count)
+            uncached = best_time(lambda: main.score_text_rows(texts, vader=vader), repeat=3)
+
+            def cold():
+                main.result_cache = ResultCache()
+                main.score_cached_rows(texts, vader=vader)
+
+            warm_cache = ResultCache()
+            main.result_cache = warm_cache
+            main.score_cached_rows(rng.choices(distinct, weights, k=count), vader=vader)
+            hits = warm_cache.hits
+            main.score_cached_rows(texts, vader=vader)
+            hit_rate = (warm_cache.hits - hits) / count
+            print("{:>8} {:>8} {:>14.2f} {:>14.2f} {:>14.2f} {:>9.0%}".format(
+                count, str(vader), uncached * 1000, best_time(cold, repeat=3) * 1000,
+                best_time(lambda: main.score_cached_rows(texts, vader=vader), repeat=3) * 1000, hit_rate))
+    main.result_cache = ResultCache()
+
+# GALC wildcard patterns ("abash*"): classifying every token with the prefix trie against testing
+# every pattern of the list with startswith, then the GALC scores of a batch
+def bench_galc(args):
+    list_dict = main.registry.get("GALC_dict")
+    index = main.registry.get("GALC_index")
+    patterns = [(category_id, pattern) for category_id, key in enumerate(list_dict) for pattern in list_dict[key]]
+    npatterns = len(patterns)
+    texts = make_texts(200, args.words)
+    token_lists = [main.tokenize_text(text)[2] for text in texts]
+    tokens = [token for tokens in token_lists for token in tokens]
+
+    def naive():
+        for token in tokens:
+            {category_id for category_id, pattern in patterns
+             if (token.startswith(pattern[:-1]) if pattern.endswith("*") else token == pattern)}
+
+    def trie():
+        for token in tokens:
+            main.match_wildcards(index, token)
+
+    categories = main.registry.get("GALC_categories")
+    print("{} patterns, {} tokens".format(npatterns, len(tokens)))
+    print("{:>16} {:>14}".format("naive (us/tok)", "trie (us/tok)"))
+    print("{:>16.2f} {:>14.3f}".format(best_time(naive, repeat=3) / len(tokens) * 1e6,
+                                       best_time(trie) / len(tokens) * 1e6))
+    print("score_text_rows, {} texts, {} GALC categories: {:.2f} ms".format(
+        len(texts), len(categories), best_time(lambda: main.score_text_rows(texts, categories)) * 1000))
+
+# Cost of the six ANEW columns on top of the NRC emotions, for growing batch sizes, and the vectorized
+# ANEW scores against a per-token Python loop over the same lookup
+def bench_anew(args):
+    ANEW_index, ANEW_matrix = main.registry.get("ANEW_index")
+    norms = ANEW_matrix.tolist()
+
+    def loop(token_lists):
+        rows = []
+        for tokens in token_lists:
+            sums, rated = [0, 0, 0], 0
+            for token in tokens:
+                word_id = ANEW_index.get(token)
+                if word_id is not None:
+                    rated += 1
+                    for dimension in range(3):
+                        sums[dimension] += norms[word_id][dimension]
+            rows.append([total / max(rated, 1) / 100 for total in sums] +
+                        [total / max(len(tokens), 1) / 100 for total in sums])
+        return rows
+
+    print("{:>8} {:>14} {:>14} {:>14} {:>14}".format("texts", "nrc (ms)", "nrc+anew (ms)", "anew loop (ms)",
+                                                      "anew (ms)"))
+    for count in [100, 1000, 10000]:
+        texts = make_texts(count, args.words)
+        token_lists = [main.tokenize_text(text)[2] for text in texts]
+        print("{:>8} {:>14.2f} {:>14.2f} {:>14.2f} {:>14.2f}".format(
+            count, best_time(lambda: main.score_text_rows(texts), repeat=3) * 1000,
+            best_time(lambda: main.score_text_rows(texts, main.NRC_CATEGORIES + main.ANEW_CATEGORIES), repeat=3) * 1000,
+            best_time(lambda: loop(token_lists), repeat=3) * 1000,
+            best_time(lambda: main.score_ANEW(token_lists), repeat=3) * 1000))
+
+# SenticNet concepts: leftmost-longest matching with the token trie against enumerating the n-grams of
+# every position (longest first) in a dict of concepts, then the SenticNet columns of whole batches
+def bench_senticnet(args):
+    concepts = main.read_SenticNet()
+    SenticNet_root, _ = main.registry.get("SenticNet_index")
+    max_words = max(len(concept.split()) for concept in concepts)
+
+    def ngrams(tokens):
+        concept_names = []
+        start = 0
+        while start < len(tokens):
+            for length in range(min(max_words, len(tokens) - start), 0, -1):
+                concept = " ".join(tokens[start:start + length])
+                if concept in concepts:
+                    concept_names.append(concept)
+                    start += length
+                    break
+            else:
+                start += 1
+        return concept_names
+
+    print("{:>8} {:>14} {:>14} {:>16}".format("texts", "n-grams (ms)", "trie (ms)", "senticnet (ms)"))
+    for count in [100, 1000, 10000]:
+        token_lists = [main.tokenize_text(text)[2] for text in make_texts(count, args.words)]
+        print("{:>8} {:>14.2f} {:>14.2f} {:>16.2f}".format(
+            count, best_time(lambda: [ngrams(tokens) for tokens in token_lists], repeat=3) * 1000,
+            best_time(lambda: [main.match_concepts(SenticNet_root, tokens) for tokens in token_lists], repeat=3) * 1000,
+            best_time(lambda: main.score_SenticNet(token_lists), repeat=3) * 1000))
+
+# Hu & Liu opinion words ride on the GI index: texts/s with the NRC emotions alone against the NRC emotions
+# plus Positive_HuLiu and Negative_HuLiu, on the per-text and the vectorized path
+def bench_opinion(args):
+    texts = make_texts(10000, args.words)
+    opinion_categories = main.NRC_CATEGORIES + list(main.OPINION_SOURCES)
+    print("{:>10} {:>16} {:>16} {:>8}".format("path", "off (texts/s)", "on (texts/s)", "on/off"))
+    for name, vectorize in [("loop", False), ("batch", True)]:
+        off = len(texts) / best_time(lambda: main.score_text_rows(texts, vectorize=vectorize))
+        on = len(texts) / best_time(lambda: main.score_text_rows(texts, opinion_categories, vectorize=vectorize))
+        print("{:>10} {:>16.0f} {:>16.0f} {:>8.2f}".format(name, off, on, on / off))
+
+# Hand-labelled lemmas of words whose lemma depends on the context: (sentence, token position, lemma)
+LEMMA_GOLD = [
+    ("She saw the bird", 1, "see"), ("He cut the board with a saw", 6, "saw"),
+    ("The leaves fall in autumn", 1, "leaf"), ("She leaves at noon", 1, "leave"),
+    ("We are meeting at six", 2, "meet"), ("The meeting ran late", 1, "meeting"),
+    ("They are building a house", 2, "build"), ("The building is tall", 1, "building"),
+    ("I am feeling better", 2, "feel"), ("Her feelings were hurt", 1, "feeling"),
+    ("He wound the clock", 1, "wind"), ("The wound healed", 1, "wound"),
+    ("She dove into the pool", 1, "dive"), ("The dove flew away", 1, "dove"),
+    ("The sun rose early", 2, "rise"), ("The rose is red", 1, "rose"),
+    ("He found the keys", 1, "find"), ("They ground the coffee", 1, "grind"),
+    ("Turn left at the corner", 1, "left"), ("She left early", 1, "leave"),
+    ("Cats have nine lives", 3, "life"), ("He lives alone", 1, "live"),
+]
+
+# Lemmatizers: accuracy on LEMMA_GOLD, then texts/s of score_text_rows with the dictionary path,
+# with nlp() called per text and with the batched nlp.pipe path of SPEAKBRIGHT_LEMMATIZER=spacy
+def bench_lemmatizer(args):
+    lemma_dict = main.registry.get("lemma_dict")
+    targets = [sentence.lower().split()[position] for sentence, position, _ in LEMMA_GOLD]
+    dictionary = [lemma_dict.get(token, token) for token in targets]
+    print("{:>20} {:>10}".format("lemmatizer", "accuracy"))
+    print("{:>20} {:>9.0%}".format("dictionary", sum(lemma == gold for lemma, (_, _, gold) in zip(dictionary, LEMMA_GOLD))
+                                  / len(LEMMA_GOLD)))
+    try:
+        nlp = main.registry.get("nlp")
+    except OSError as e:
+        print("spacy: en_core_web_sm is not available ({})".format(e))
+        return
+    sentences = [sentence.split() for sentence, _, _ in LEMMA_GOLD]
+    spacy = [lemmas[position] for lemmas, (_, position, _) in zip(main.spacy_lemmas(sentences), LEMMA_GOLD)]
+    print("{:>20} {:>9.0%}".format("spacy", sum(lemma == gold for lemma, (_, _, gold) in zip(spacy, LEMMA_GOLD))
+                                  / len(LEMMA_GOLD)))
+
+    texts = make_texts(2000, args.words)
+
+    def per_text():
+        for text in texts:
+            [token.lemma_ for token in nlp(text)]
+
+    print("{:>20} {:>14}".format("path", "texts/s"))
+    print("{:>20} {:>14.0f}".format("dictionary", len(texts) / best_time(lambda: main.score_text_rows(texts), repeat=3)))
+    print("{:>20} {:>14.0f}".format("nlp() per text", len(texts) / best_time(per_text, repeat=1)))
+    configured = main.lemmatizer, main.SPACY_BATCH_SIZE
+    try:
+        main.lemmatizer = "spacy"
+        for batch_size in [64, 256, 1024]:
+            main.SPACY_BATCH_SIZE = batch_size
+            print("{:>20} {:>14.0f}".format("nlp.pipe ({})".format(batch_size),
+                                            len(texts) / best_time(lambda: main.score_text_rows(texts), repeat=1)))
+    finally:
+        main.lemmatizer, main.SPACY_BATCH_SIZE = configured
+
+BENCHMARKS = {
+    "anew": bench_anew,
+    "batch": bench_batch,
+    "cache": bench_cache,
+    "categories": bench_categories,
+    "combined": bench_combined,
+    "encode": bench_encode,
+    "emoji": bench_emoji,
+    "galc": bench_galc,
+    "idioms": bench_idioms,
+    "importtime": bench_importtime,
+    "lemmatizer": bench_lemmatizer,
+    "opinion": bench_opinion,
+    "senticnet": bench_senticnet,
+    "sentitext": bench_sentitext,
+    "startup": bench_startup,
+    "streaming": bench_streaming,
+    "vader": bench_vader,
+    "vader_batch": bench_vader_batch,
+    "vader_memory": bench_vader_memory,
+    "vader_regression": bench_vader_regression,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the emotion scoring engine")
+    parser.add_argument("benchmark", nargs="*", help="benchmarks to run: {} (default: all)".format(", ".join(sorted(BENCHMARKS))))
+    parser.add_argument("--words", type=int, default=12, help="words per synthetic utterance")
+    args = parser.parse_args()
+    unknown = set(args.benchmark) - set(BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmark(s): {}".format(", ".join(sorted(unknown))))
+
+    failed = []
+    for name in args.benchmark or sorted(BENCHMARKS):
+        print("== {}".format(name))
+        # A benchmark that checks a budget (or a frozen baseline) returns False when it fails
+        if BENCHMARKS[name](args) is False:
+            failed.append(name)
+    if failed:
+        sys.exit("failed: {}".format(", ".join(failed)))
@@ -0,0 +1,316 @@
+"""
+Offline bulk scoring of transcript archives.
+
+Reads text (one text per line, or one per file), CSV/TSV and JSONL inputs,
+scores them with the same core as /Emotion-Analysis/ in a pool of worker
+processes and writes CSV, JSONL or columnar (Parquet, or NumPy .npz parts when
+pyarrow is not installed) output. Progress is checkpointed after every chunk,
+so an interrupted run continues where it stopped with --resume.
+
+    python bulk_score.py transcripts/ --output scores.csv --workers 8
+    python bulk_score.py calls.jsonl --text-field utterance --output scores/ --output-format columnar --resume
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+
+import main
+
+INPUT_FORMATS = {".txt": "text", ".csv": "csv", ".tsv": "tsv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+OUTPUT_FORMATS = ("csv", "jsonl", "columnar")
+
+
+# Function to expand files and directories into the sorted list of input files. `exclude` lists the
+# files and directories the run writes (output, checkpoint), which must never be read back as input.
+def find_inputs(paths, exclude=()):
+    excluded = [os.path.realpath(path) for path in exclude]
+
+    def is_excluded(path):
+        path = os.path.realpath(path)
+        return any(path == other or path.startswith(other + os.sep) for other in excluded)
+
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                inputs.extend(os.path.join(root, name) for name in files
+                              if os.path.splitext(name)[1].lower() in INPUT_FORMATS)
+        else:
+            inputs.append(path)
+    return sorted(path for path in inputs if not is_excluded(path))
+
+# Function to read (index, text) records from one input file, streaming it line by line
+def read_records(path, args):
+    input_format = INPUT_FORMATS.get(os.path.splitext(path)[1].lower(), "text")
+    with open(path, encoding="utf-8", newline="" if input_format in ("csv", "tsv") else None) as f:
+        if input_format == "text":
+            if args.text_mode == "file":
+                yield 0, f.read()
+            else:
+                for index, line in enumerate(f):
+                    yield index, line.rstrip("\n")
+        elif input_format in ("csv", "tsv"):
+            reader = csv.DictReader(f, delimiter="\t" if input_format == "tsv" else ",")
+            if args.text_column not in (reader.fieldnames or []):
+                raise SystemExit("{}: no {!r} column".format(path, args.text_column))
+            for index, row in enumerate(reader):
+                yield index, row[args.text_column] or ""
+        else:
+            for index, line in enumerate(f):
+                if not line.strip():
+                    continue
+                # A bad record stops the run with its location rather than a traceback
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise SystemExit("{}:{}: invalid JSON ({})".format(path, index + 1, e))
+                if isinstance(record, dict):
+                    record = record.get(args.text_field)
+                    if not isinstance(record, str):
+                        raise SystemExit("{}:{}: no {!r} string field".format(path, index + 1, args.text_field))
+                elif not isinstance(record, str):
+                    raise SystemExit("{}:{}: expected a JSON object or string".format(path, index + 1))
+                yield index, record
+
+# Function to read (source, index, text) records from all inputs
+def iter_records(inputs, args):
+    for path in inputs:
+        for index, text in read_records(path, args):
+            yield path, index, text
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# Worker: score one chunk of records with the shared scoring core (every worker has its own result cache)
+def score_chunk(job):
+    records, categories, vader = job
+    rows = main.score_cached_rows([text for _, _, text in records], categories, vader=vader)
+    return [(source, index, row) for (source, index, _), row in zip(records, rows)]
+
+# Function to score chunks in a process pool, yielding results in input order. At most
+# `window` chunks are in flight, so memory stays bounded however large the inputs are.
+def score_chunks(jobs, workers, window):
+    if workers <= 1:
+        main.warm_up()
+        for job in jobs:
+            yield score_chunk(job)
+        return
+
+    with Pool(workers, initializer=main.warm_up) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.apply_async(score_chunk, (job,)))
+            if len(pending) >= window:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+class RowWriter(object):
+    """
+    Appends scored rows to a CSV or JSONL file. position() is the file size, which
+    the checkpoint records so that a resumed run can drop a partially written chunk.
+    """
+
+    def __init__(self, path, output_format, header_list, include_text, position=0):
+        self.output_format = output_format
+        self.header_list = header_list
+        self.include_text = include_text
+        self.file = open(path, "a+", encoding="utf-8", newline="")
+        self.file.truncate(position)
+        self.file.seek(position)
+        if output_format == "csv":
+            self.writer = csv.writer(self.file)
+            if position == 0:
+                self.writer.writerow(["source", "index"] + (["sentence"] if include_text else []) + header_list)
+
+    def write(self, scored):
+        for source, index, row in scored:
+            if self.output_format == "csv":
+                self.writer.writerow([source, index] + ([row["sentence"]] if self.include_text else []) +
+                                     [row["nwords"]] + row["data"])
+            else:
+                record = {"source": source, "index": index}
+                if self.include_text:
+                    record["sentence"] = row["sentence"]
+                record.update(zip(self.header_list, [row["nwords"]] + row["data"]))
+                self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def position(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ColumnarWriter(object):
+    """
+    Writes every chunk as one columnar part file in the output directory: Parquet
+    when pyarrow is installed, otherwise a NumPy .npz with one array per column.
+    position() is the number of parts written.
+    """
+
+    def __init__(self, path, header_list, include_text, position=0):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            self.pyarrow = pyarrow
+        except ImportError:
+            self.pyarrow = None
+        self.path = path
+        self.header_list = header_list
+        self.include_text = include_text
+        self.parts = position
+        os.makedirs(path, exist_ok=True)
+        # Drop parts written after the last checkpoint
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:10]) >= position:
+                os.remove(os.path.join(path, name))
+
+    def write(self, scored):
+        columns = {
+            "source": np.array([source for source, _, _ in scored], dtype=object),
+            "index": np.array([index for _, index, _ in scored], dtype=np.int64),
+        }
+        if self.include_text:
+            columns["sentence"] = np.array([row["sentence"] for _, _, row in scored], dtype=object)
+        columns["nwords"] = np.array([row["nwords"] for _, _, row in scored], dtype=np.int64)
+        matrix = np.array([row["data"] for _, _, row in scored], dtype=np.float64).reshape(
+            len(scored), len(self.header_list) - 1)
+        for i, header in enumerate(self.header_list[1:]):
+            columns[header] = matrix[:, i]
+
+        name = os.path.join(self.path, "part-{:05d}".format(self.parts))
+        if self.pyarrow is not None:
+            table = self.pyarrow.table({key: list(value) if value.dtype == object else value
+                                        for key, value in columns.items()})
+            self.pyarrow.parquet.write_table(table, name + ".parquet")
+        else:
+            np.savez(name + ".npz", **{key: value.astype(str) if value.dtype == object else value
+                                       for key, value in columns.items()})
+        self.parts += 1
+
+    def position(self):
+        return self.parts
+
+    def close(self):
+        pass
+
+
+# Checkpoint helpers: the checkpoint is replaced atomically after every chunk
+def load_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def run(args):
+    checkpoint_path = args.checkpoint or args.output.rstrip("/\\") + ".checkpoint.json"
+    inputs = find_inputs(args.inputs, exclude=[args.output, checkpoint_path, checkpoint_path + ".tmp"])
+    if not inputs:
+        raise SystemExit("no input files found")
+    try:
+        categories = main.resolve_categories(args.categories)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    header_list = main.result_headers(categories, args.vader)
+
+    # Resume only when the checkpoint describes the same job
+    job = {"inputs": inputs, "categories": categories, "output_format": args.output_format,
+           "include_text": args.include_text, "text_mode": args.text_mode, "text_column": args.text_column,
+           "text_field": args.text_field, "vader": args.vader}
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else None
+    if checkpoint is not None and checkpoint["job"] != job:
+        raise SystemExit("{} belongs to a different job, remove it or drop --resume".format(checkpoint_path))
+    if checkpoint is None:
+        checkpoint = {"job": job, "texts": 0, "words": 0, "position": 0}
+
+    if args.output_format == "columnar":
+        writer = ColumnarWriter(args.output, header_list, args.include_text, checkpoint["position"])
+    else:
+        writer = RowWriter(args.output, args.output_format, header_list, args.include_text, checkpoint["position"])
+
+    skipped = checkpoint["texts"]
+    records = islice(iter_records(inputs, args), skipped, None)
+    jobs = ((chunk, categories, args.vader) for chunk in chunked(records, args.chunk_size))
+
+    start = time.perf_counter()
+    texts = words = 0
+    try:
+        for scored in score_chunks(jobs, args.workers, args.workers * 2):
+            writer.write(scored)
+            chunk_words = sum(row["nwords"] for _, _, row in scored)
+            texts += len(scored)
+            words += chunk_words
+            checkpoint.update(texts=skipped + texts, words=checkpoint["words"] + chunk_words,
+                              position=writer.position())
+            save_checkpoint(checkpoint_path, checkpoint)
+            if args.progress:
+                elapsed = time.perf_counter() - start
+                print("{} texts, {:.0f} texts/s".format(skipped + texts, texts / elapsed), file=sys.stderr)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    # Throughput report
+    print("inputs:      {} files".format(len(inputs)), file=sys.stderr)
+    print("resumed at:  {} texts".format(skipped), file=sys.stderr)
+    print("scored:      {} texts, {} words in {:.2f} s".format(texts, words, elapsed), file=sys.stderr)
+    print("throughput:  {:.0f} texts/s, {:.0f} words/s with {} worker(s)".format(
+        texts / elapsed if elapsed else 0, words / elapsed if elapsed else 0, args.workers), file=sys.stderr)
+    print("output:      {} ({})".format(args.output, args.output_format), file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Score text, CSV/TSV and JSONL files with the emotion lexicons")
+    parser.add_argument("inputs", nargs="+", help="input files or directories (searched recursively)")
+    parser.add_argument("-o", "--output", required=True, help="output file (csv, jsonl) or directory (columnar)")
+    parser.add_argument("-f", "--output-format", choices=OUTPUT_FORMATS,
+                        help="output format (default: from the output suffix, columnar for directories)")
+    parser.add_argument("--categories", help='comma-separated category names, or "all" (default: the NRC emotions)')
+    parser.add_argument("--vader", action="store_true", help="append the VADER valence scores (neg, neu, pos, compound)")
+    parser.add_argument("--text-mode", choices=("line", "file"), default="line",
+                        help="for .txt inputs: one text per line (default) or one text per file")
+    parser.add_argument("--text-column", default="text", help="CSV/TSV column holding the text (default: text)")
+    parser.add_argument("--text-field", default="text", help="JSONL field holding the text (default: text)")
+    parser.add_argument("--include-text", action="store_true", help="write the normalized sentence next to the scores")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="texts per chunk (and per checkpoint)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint of an interrupted run")
+    parser.add_argument("--progress", action="store_true", help="report progress after every chunk")
+    args = parser.parse_args(argv)
+
+    if args.output_format is None:
+        suffix = os.path.splitext(args.output)[1].lower().lstrip(".")
+        args.output_format = suffix if suffix in ("csv", "jsonl") else "columnar"
+    if args.categories not in (None, "all"):
+        args.categories = [name.strip() for name in args.categories.split(",") if name.strip()]
+    return args
+
+
+if __name__ == "__main__":
+    run(parse_args())
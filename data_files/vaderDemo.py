@@ -0,0 +1,188 @@
+# coding: utf-8
+# Examples and translation demo for the VADER sentiment analyzer, kept out of
+# vaderSentiment.py so that importing the analyzer loads no network libraries.
+# Run from the repository root: python data_files/vaderDemo.py
+
+import json
+
+from vaderSentiment import SentimentIntensityAnalyzer
+
+
+def main():
+    # --- examples -------
+    sentences = ["VADER is smart, handsome, and funny.",  # positive sentence example
+                 "VADER is smart, handsome, and funny!",
+                 # punctuation emphasis handled correctly (sentiment intensity adjusted)
+                 "VADER is very smart, handsome, and funny.",
+                 # booster words handled correctly (sentiment intensity adjusted)
+                 "VADER is VERY SMART, handsome, and FUNNY.",  # emphasis for ALLCAPS handled
+                 "VADER is VERY SMART, handsome, and FUNNY!!!",
+                 # combination of signals - VADER appropriately adjusts intensity
+                 "VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!",
+                 # booster words & punctuation make this close to ceiling for score
+                 "VADER is not smart, handsome, nor funny.",  # negation sentence example
+                 "The book was good.",  # positive sentence
+                 "At least it isn't a horrible book.",  # negated negative sentence with contraction
+                 "The book was only kind of good.",
+                 # qualified positive sentence is handled correctly (intensity adjusted)
+                 "The plot was good, but the characters are uncompelling and the dialog is not great.",
+                 # mixed negation sentence
+                 "Today SUX!",  # negative slang with capitalization emphasis
+                 "Today only kinda sux! But I'll get by, lol",
+                 # mixed sentiment example with slang and constrastive conjunction "but"
+                 "Make sure you :) or :D today!",  # emoticons handled
+                 "Catch utf-8 emoji such as 💘 and 💋 and 😁",  # emojis handled
+                 "Not bad at all"  # Capitalized negation
+                 ]
+
+    analyzer = SentimentIntensityAnalyzer()
+
+    print("----------------------------------------------------")
+    print(" - Analyze typical example cases, including handling of:")
+    print("  -- negations")
+    print("  -- punctuation emphasis & punctuation flooding")
+    print("  -- word-shape as emphasis (capitalization difference)")
+    print("  -- degree modifiers (intensifiers such as 'very' and dampeners such as 'kind of')")
+    print("  -- slang words as modifiers such as 'uber' or 'friggin' or 'kinda'")
+    print("  -- contrastive conjunction 'but' indicating a shift in sentiment; sentiment of later text is dominant")
+    print("  -- use of contractions as negations")
+    print("  -- sentiment laden emoticons such as :) and :D")
+    print("  -- utf-8 encoded emojis such as 💘 and 💋 and 😁")
+    print("  -- sentiment laden slang words (e.g., 'sux')")
+    print("  -- sentiment laden initialisms and acronyms (for example: 'lol') \n")
+    for sentence in sentences:
+        vs = analyzer.polarity_scores(sentence)
+        print("{:-<65} {}".format(sentence, str(vs)))
+    print("----------------------------------------------------")
+    print(" - About the scoring: ")
+    print("""  -- The 'compound' score is computed by summing the valence scores of each word in the lexicon, adjusted 
+     according to the rules, and then normalized to be between -1 (most extreme negative) and +1 (most extreme positive). 
+     This is the most useful metric if you want a single unidimensional measure of sentiment for a given sentence.  
+     Calling it a 'normalized, weighted composite score' is accurate.""")
+    print("""  -- The 'pos', 'neu', and 'neg' scores are ratios for proportions of text that fall in each category (so these   
+     should all add up to be 1... or close to it with float operation).  These are the most useful metrics if 
+     you want multidimensional measures of sentiment for a given sentence.""")
+    print("----------------------------------------------------")
+
+    # input("\nPress Enter to continue the demo...\n")  # for DEMO purposes...
+
+    tricky_sentences = ["Sentiment analysis has never been good.",
+                        "Sentiment analysis has never been this good!",
+                        "Most automated sentiment analysis tools are shit.",
+                        "With VADER, sentiment analysis is the shit!",
+                        "Other sentiment analysis tools can be quite bad.",
+                        "On the other hand, VADER is quite bad ass",
+                        "VADER is such a badass!",  # slang with punctuation emphasis
+                        "Without a doubt, excellent idea.",
+                        "Roger Dodger is one of the most compelling variations on this theme.",
+                        "Roger Dodger is at least compelling as a variation on the theme.",
+                        "Roger Dodger is one of the least compelling variations on this theme.",
+                        "Not such a badass after all.",  # Capitalized negation with slang
+                        "Without a doubt, an excellent idea."  # "without {any} doubt" as negation
+                        ]
+    print("----------------------------------------------------")
+    print(" - Analyze examples of tricky sentences that cause trouble to other sentiment analysis tools.")
+    print("  -- special case idioms - e.g., 'never good' vs 'never this good', or 'bad' vs 'bad ass'.")
+    print("  -- special uses of 'least' as negation versus comparison \n")
+    for sentence in tricky_sentences:
+        vs = analyzer.polarity_scores(sentence)
+        print("{:-<69} {}".format(sentence, str(vs)))
+    print("----------------------------------------------------")
+
+    # input("\nPress Enter to continue the demo...\n")  # for DEMO purposes...
+
+    print("----------------------------------------------------")
+    print(
+        " - VADER works best when analysis is done at the sentence level (but it can work on single words or entire novels).")
+    paragraph = "It was one of the worst movies I've seen, despite good reviews. Unbelievably bad acting!! Poor direction. VERY poor production. The movie was bad. Very bad movie. VERY BAD movie!"
+    print("  -- For example, given the following paragraph text from a hypothetical movie review:\n\t'{}'".format(
+        paragraph))
+    print(
+        "  -- You could use NLTK to break the paragraph into sentence tokens for VADER, then average the results for the paragraph like this: \n")
+    # simple example to tokenize paragraph into sentences for VADER
+    from nltk import tokenize
+
+    sentence_list = tokenize.sent_tokenize(paragraph)
+    paragraphSentiments = 0.0
+    for sentence in sentence_list:
+        vs = analyzer.polarity_scores(sentence)
+        print("{:-<69} {}".format(sentence, str(vs["compound"])))
+        paragraphSentiments += vs["compound"]
+    print("AVERAGE SENTIMENT FOR PARAGRAPH: \t" + str(round(paragraphSentiments / len(sentence_list), 4)))
+    print("----------------------------------------------------")
+
+    # input("\nPress Enter to continue the demo...\n")  # for DEMO purposes...
+
+    print("----------------------------------------------------")
+    print(" - Analyze sentiment of IMAGES/VIDEO data based on annotation 'tags' or image labels. \n")
+    conceptList = ["balloons", "cake", "candles", "happy birthday", "friends", "laughing", "smiling", "party"]
+    conceptSentiments = 0.0
+    for concept in conceptList:
+        vs = analyzer.polarity_scores(concept)
+        print("{:-<15} {}".format(concept, str(vs['compound'])))
+        conceptSentiments += vs["compound"]
+    print("AVERAGE SENTIMENT OF TAGS/LABELS: \t" + str(round(conceptSentiments / len(conceptList), 4)))
+    print("\t")
+    conceptList = ["riot", "fire", "fight", "blood", "mob", "war", "police", "tear gas"]
+    conceptSentiments = 0.0
+    for concept in conceptList:
+        vs = analyzer.polarity_scores(concept)
+        print("{:-<15} {}".format(concept, str(vs['compound'])))
+        conceptSentiments += vs["compound"]
+    print("AVERAGE SENTIMENT OF TAGS/LABELS: \t" + str(round(conceptSentiments / len(conceptList), 4)))
+    print("----------------------------------------------------")
+
+    # input("\nPress Enter to continue the demo...")  # for DEMO purposes...
+
+    do_translate = input(
+        "\nWould you like to run VADER demo examples with NON-ENGLISH text? (Note: requires Internet access) \n Type 'y' or 'n', then press Enter: ")
+    if do_translate.lower().lstrip().__contains__("y"):
+        import requests  # only the translation demo needs network access
+
+        print("\n----------------------------------------------------")
+        print(" - Analyze sentiment of NON ENGLISH text...for example:")
+        print("  -- French, German, Spanish, Italian, Russian, Japanese, Arabic, Chinese")
+        print("  -- many other languages supported. \n")
+        languages = ["English", "French", "German", "Spanish", "Italian", "Russian", "Japanese", "Arabic", "Chinese"]
+        language_codes = ["en", "fr", "de", "es", "it", "ru", "ja", "ar", "zh"]
+        nonEnglish_sentences = ["I'm surprised to see just how amazingly helpful VADER is!",
+                                "Je suis surpris de voir juste comment incroyablement utile VADER est!",
+                                "Ich bin überrascht zu sehen, nur wie erstaunlich nützlich VADER!",
+                                "Me sorprende ver sólo cómo increíblemente útil VADER!",
+                                "Sono sorpreso di vedere solo come incredibilmente utile VADER è!",
+                                "Я удивлен увидеть, как раз как удивительно полезно ВЕЙДЕРА!",
+                                "私はちょうどどのように驚くほど役に立つベイダーを見て驚いています!",
+                                "أنا مندهش لرؤية فقط كيف مثير للدهشة فيدر فائدة!",
+                                "惊讶地看到有用维德是的只是如何令人惊讶了 ！"
+                                ]
+        for sentence in nonEnglish_sentences:
+            to_lang = "en"
+            from_lang = language_codes[nonEnglish_sentences.index(sentence)]
+            if (from_lang == "en") or (from_lang == "en-US"):
+                translation = sentence
+                translator_name = "No translation needed"
+            else:  # please note usage limits for My Memory Translation Service:   http://mymemory.translated.net/doc/usagelimits.php
+                # using   MY MEMORY NET   http://mymemory.translated.net
+                api_url = "http://mymemory.translated.net/api/get?q={}&langpair={}|{}".format(sentence, from_lang,
+                                                                                              to_lang)
+                hdrs = {
+                    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11',
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                    'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.3',
+                    'Accept-Encoding': 'none',
+                    'Accept-Language': 'en-US,en;q=0.8',
+                    'Connection': 'keep-alive'}
+                response = requests.get(api_url, headers=hdrs)
+                response_json = json.loads(response.text)
+                translation = response_json["responseData"]["translatedText"]
+                translator_name = "MemoryNet Translation Service"
+            vs = analyzer.polarity_scores(translation)
+            print("- {: <8}: {: <69}\t {} ({})".format(languages[nonEnglish_sentences.index(sentence)], sentence,
+                                                       str(vs['compound']), translator_name))
+        print("----------------------------------------------------")
+
+    print("\n\n Demo Done!")
+
+
+if __name__ == '__main__':
+    main()
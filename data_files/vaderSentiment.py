@@ -15,10 +15,8 @@ import sys
 import re
 import math
 import string
-import requests
-import json
-from itertools import product
-from inspect import getsourcefile
+from array import array
+from bisect import bisect_left
 
 def resource_path(relative):
 	if hasattr(sys, "_MEIPASS"):
@@ -40,6 +38,8 @@ REGEX_REMOVE_PUNCTUATION = re.compile('[%s]' % re.escape(string.punctuation))
 
 PUNC_LIST = [".", "!", "?", ",", ";", ":", "-", "'", "\"",
              "!!", "!!!", "??", "???", "?!?", "!?!", "?!?!", "!?!?"]
+PUNC_SET = frozenset(PUNC_LIST)
+PUNCTUATION_CHARS = frozenset(string.punctuation)
 NEGATE = \
     ["aint", "arent", "cannot", "cant", "couldnt", "darent", "didnt", "doesnt",
      "ain't", "aren't", "can't", "couldn't", "daren't", "didn't", "doesn't",
@@ -84,17 +84,22 @@ SPECIAL_CASE_IDIOMS = {"the shit": 3, "the bomb": 3, "bad ass": 1.5, "yeah right
                        "kiss of death": -1.5}
 
 
+# columns of the array returned by SentimentIntensityAnalyzer.polarity_scores_batch
+BATCH_COLUMNS = ("neg", "neu", "pos", "compound")
+
+
 # #Static methods# #
 
+NEGATE_SET = frozenset(NEGATE)
+
+
 def negated(input_words, include_nt=True):
     """
     Determine if input contains negation words
     """
     input_words = [str(w).lower() for w in input_words]
-    neg_words = []
-    neg_words.extend(NEGATE)
-    for word in neg_words:
-        if word in input_words:
+    for word in input_words:
+        if word in NEGATE_SET:
             return True
     if include_nt:
         for word in input_words:
@@ -170,27 +175,42 @@ class SentiText(object):
         self.words_and_emoticons = self._words_and_emoticons()
         # doesn't separate words from\
         # adjacent punctuation (keeps emoticons & contractions)
+        self.words_and_emoticons_lower = [str(w).lower() for w in self.words_and_emoticons]
+        # lowercased once here, so that the look-back checks never re-lowercase the token list
         self.is_cap_diff = allcap_differential(self.words_and_emoticons)
 
-    def _words_plus_punc(self):
+    @classmethod
+    def from_words(cls, words_and_emoticons, words_and_emoticons_lower, is_cap_diff):
         """
-        Returns mapping of form:
-        {
-            'cat,': 'cat',
-            ',cat': 'cat',
-        }
+        Build a SentiText from already tokenized (and lowercased) words, given
+        as lists or tuples
         """
-        no_punc_text = REGEX_REMOVE_PUNCTUATION.sub('', self.text)
-        # removes punctuation (but loses emoticons & contractions)
-        words_only = no_punc_text.split()
-        # remove singletons
-        words_only = set(w for w in words_only if len(w) > 1)
-        # the product gives ('cat', ',') and (',', 'cat')
-        punc_before = {''.join(p): p[1] for p in product(PUNC_LIST, words_only)}
-        punc_after = {''.join(p): p[0] for p in product(words_only, PUNC_LIST)}
-        words_punc_dict = punc_before
-        words_punc_dict.update(punc_after)
-        return words_punc_dict
+        sentitext = cls.__new__(cls)
+        sentitext.text = None
+        sentitext.words_and_emoticons = words_and_emoticons
+        sentitext.words_and_emoticons_lower = words_and_emoticons_lower
+        sentitext.is_cap_diff = is_cap_diff
+        return sentitext
+
+    @staticmethod
+    def _strip_punc(we):
+        """
+        Strip one PUNC_LIST entry from the start or the end of a token, e.g.
+        'cat,' -> 'cat' and ',cat' -> 'cat', when what remains is a word of at
+        least two characters without any punctuation. Anything else (emoticons,
+        contractions, 'cat,,') is returned unchanged.
+        """
+        if we[0] in PUNCTUATION_CHARS:
+            word = we.lstrip(string.punctuation)
+            punc = we[:len(we) - len(word)]
+        elif we[-1] in PUNCTUATION_CHARS:
+            word = we.rstrip(string.punctuation)
+            punc = we[len(word):]
+        else:
+            return we
+        if punc in PUNC_SET and len(word) > 1 and not REGEX_REMOVE_PUNCTUATION.search(word):
+            return word
+        return we
 
     def _words_and_emoticons(self):
         """
@@ -198,13 +218,173 @@ class SentiText(object):
         Leaves contractions and most emoticons
             Does not preserve punc-plus-letter emoticons (e.g. :D)
         """
-        wes = self.text.split()
-        words_punc_dict = self._words_plus_punc()
-        wes = [we for we in wes if len(we) > 1]
-        for i, we in enumerate(wes):
-            if we in words_punc_dict:
-                wes[i] = words_punc_dict[we]
-        return wes
+        strip_punc = self._strip_punc
+        return [strip_punc(we) for we in self.text.split() if len(we) > 1]
+
+
+class PhraseMatcher(object):
+    """
+    Token-level trie over multi-word phrases (idioms, booster n-grams).
+    find() reports every phrase occurring in a token list in one pass.
+    """
+
+    def __init__(self, phrases=()):
+        self.root = {}
+        for phrase in phrases:
+            self.add(phrase)
+
+    def add(self, phrase):
+        node = self.root
+        for token in phrase.split():
+            node = node.setdefault(token, {})
+        node[None] = phrase  # tokens are never None, so this marks the end of a phrase
+
+    def find(self, tokens):
+        """
+        Return the phrases found in `tokens` as a {(start, length): phrase} dict
+        """
+        matches = {}
+        root = self.root
+        count = len(tokens)
+        for start, token in enumerate(tokens):
+            node = root.get(token)
+            end = start + 1
+            while node is not None:
+                if None in node:
+                    matches[(start, end - start)] = node[None]
+                if end == count:
+                    break
+                node = node.get(tokens[end])
+                end += 1
+        return matches
+
+
+class Lexicon(dict):
+    """
+    The VADER lexicon: a dict of word -> mean valence, so that the scoring
+    probes stay plain dict lookups. Keys are interned and equal valences share
+    one float object (the lexicon has about 70 distinct valences for 7.5k
+    words). The std-dev and the ten human ratings of every word are only kept
+    when `columns` is given, as a float32 array and an int8 array.
+    """
+
+    def __init__(self, items=(), columns=None):
+        valences = {}
+        super(Lexicon, self).__init__((sys.intern(word), valences.setdefault(valence, valence))
+                                      for word, valence in items)
+        self._words = None
+        if columns:
+            # columns: {word: (std_dev, ratings)}, stored in sorted word order
+            self._words = sorted(columns)
+            self._std_devs = array('f', (columns[word][0] for word in self._words))
+            self._ratings = array('b')
+            self._rating_offsets = array('I', [0])
+            for word in self._words:
+                self._ratings.extend(columns[word][1])
+                self._rating_offsets.append(len(self._ratings))
+
+    def has_columns(self):
+        return self._words is not None
+
+    def _position(self, word):
+        if self._words is None:
+            raise ValueError("the lexicon was loaded without its std-dev and ratings columns")
+        i = bisect_left(self._words, word)
+        if i == len(self._words) or self._words[i] != word:
+            raise KeyError(word)
+        return i
+
+    def std_dev(self, word):
+        """
+        Return the standard deviation of the ratings of a word
+        """
+        i = self._position(word)
+        return self._std_devs[i]
+
+    def ratings(self, word):
+        """
+        Return the ten human ratings (-4 to 4) of a word
+        """
+        i = self._position(word)
+        return self._ratings[self._rating_offsets[i]:self._rating_offsets[i + 1]].tolist()
+
+
+class EmojiMatcher(object):
+    """
+    Finds emojis anywhere in a text, including multi-codepoint sequences (ZWJ
+    sequences, skin tones, flags, keycaps) and emojis glued to words, in one
+    scan. A regex finds the runs of non-ASCII codepoints; a run that is one
+    emoji is looked up directly, other runs are split by probing the emoji
+    dict for the longest emoji at every position.
+    """
+
+    def __init__(self, emojis):
+        self.emojis = emojis
+        self.max_length = max(map(len, emojis), default=0)
+        # emojis are runs of non-ASCII codepoints, plus the few ASCII characters of keycaps
+        # (a character class of every emoji codepoint is much slower to scan)
+        ascii_chars = "".join(sorted(set(char for emoji in emojis for char in emoji if char.isascii())))
+        self._ascii_entries = any(emoji.isascii() for emoji in emojis)
+        if self._ascii_entries:
+            self._runs = re.compile(r"\S+")
+        elif ascii_chars:
+            self._runs = re.compile("[{0}]*[\x80-\U0010ffff][{0}\x80-\U0010ffff]*".format(re.escape(ascii_chars)))
+        else:
+            self._runs = re.compile("[\x80-\U0010ffff]+")
+        self._replacements = {}
+
+    def replacement(self, emoji):
+        """
+        Return the description of an emoji, padded with spaces so that it splits
+        off the surrounding words (cached per emoji)
+        """
+        replacement = self._replacements.get(emoji)
+        if replacement is None:
+            replacement = self._replacements[emoji] = " {} ".format(self.emojis[emoji])
+        return replacement
+
+    def find(self, text):
+        """
+        Return the (start, end, emoji) of every emoji in the text
+        """
+        found = []
+        if not self.emojis or (text.isascii() and not self._ascii_entries):
+            return found
+        emojis = self.emojis
+        for match in self._runs.finditer(text):
+            run = match.group()
+            offset = match.start()
+            if run in emojis:
+                found.append((offset, match.end(), run))
+                continue
+            # several emojis in a row (or codepoints that are no emoji): take the longest
+            # emoji at every position
+            start = 0
+            while start < len(run):
+                for end in range(min(len(run), start + self.max_length), start, -1):
+                    if run[start:end] in emojis:
+                        found.append((offset + start, offset + end, run[start:end]))
+                        start = end
+                        break
+                else:
+                    start += 1
+        return found
+
+    def replace(self, text):
+        """
+        Replace every emoji of the text with its textual description
+        """
+        found = self.find(text)
+        if not found:
+            return text
+        pieces = []
+        last = 0
+        for start, end, emoji in found:
+            pieces.append(text[last:start])
+            pieces.append(self.replacement(emoji))
+            last = end
+        pieces.append(text[last:])
+        return "".join(pieces)
 
 
 class SentimentIntensityAnalyzer(object):
@@ -212,33 +392,64 @@ class SentimentIntensityAnalyzer(object):
     Give a sentiment intensity score to sentences.
     """
 
-    def __init__(self, lexicon_file="data_files/vader_lexicon.txt", emoji_lexicon="data_files/emoji_utf8_lexicon.txt"):
-        with open(resource_path(lexicon_file), encoding='utf-8') as f:
-            self.lexicon_full_filepath = f.read()
-        self.lexicon = self.make_lex_dict()
-
-        with open(resource_path(emoji_lexicon), encoding='utf-8') as f:
-            self.emoji_full_filepath = f.read()
-        self.emojis = self.make_emoji_dict()
+    def __init__(self, lexicon_file="data_files/vader_lexicon.txt", emoji_lexicon="data_files/emoji_utf8_lexicon.txt",
+                 lexicon=None, emojis=None, idioms=None, lexicon_columns=False):
+        # `lexicon` and `emojis` accept already loaded mappings (e.g. from a compiled
+        # lexicon cache), in which case the corresponding file is not read.
+        # `idioms` adds {idiom: valence} entries to SPECIAL_CASE_IDIOMS for this analyzer.
+        # `lexicon_columns` also keeps the std-dev and ratings columns of the lexicon file.
+        if lexicon is None:
+            lexicon = self.make_lex_dict(lexicon_file, lexicon_columns)
+        elif not isinstance(lexicon, Lexicon):
+            lexicon = Lexicon(lexicon.items())
+        self.lexicon = lexicon
+
+        if emojis is None:
+            emojis = self.make_emoji_dict(emoji_lexicon)
+        self.emojis = emojis
+        self.emoji_matcher = EmojiMatcher(emojis)
+
+        self.idioms = dict(SPECIAL_CASE_IDIOMS)
+        if idioms:
+            self.idioms.update(idioms)
+        # all multi-word entries are matched by one trie, in one pass per text
+        self.phrase_matcher = PhraseMatcher(
+            [phrase for phrase in list(self.idioms) + list(BOOSTER_DICT) + list(SENTIMENT_LADEN_IDIOMS)
+             if " " in phrase])
 
-    def make_lex_dict(self):
+    @staticmethod
+    def make_lex_dict(lexicon_file, columns=False):
         """
-        Convert lexicon file to a dictionary
+        Convert lexicon file to a Lexicon, reading it line by line
         """
-        lex_dict = {}
-        for line in self.lexicon_full_filepath.split('\n'):
-            (word, measure) = line.strip().split('\t')[0:2]
-            lex_dict[word] = float(measure)
-        return lex_dict
+        entries = {}
+        with open(resource_path(lexicon_file), encoding='utf-8') as f:
+            for line in f:
+                fields = line.strip().split('\t')
+                if len(fields) < 2:
+                    continue
+                if columns:
+                    ratings = [int(rating) for rating in fields[3].strip('[]').split(',')]
+                    entries[fields[0]] = (float(fields[1]), float(fields[2]), ratings)
+                else:
+                    entries[fields[0]] = float(fields[1])
+        if not columns:
+            return Lexicon(entries.items())
+        return Lexicon(((word, entry[0]) for word, entry in entries.items()),
+                       columns={word: entry[1:] for word, entry in entries.items()})
 
-    def make_emoji_dict(self):
+    @staticmethod
+    def make_emoji_dict(emoji_lexicon):
         """
-        Convert emoji lexicon file to a dictionary
+        Convert emoji lexicon file to a dictionary, reading it line by line
         """
         emoji_dict = {}
-        for line in self.emoji_full_filepath.split('\n'):
-            (emoji, description) = line.strip().split('\t')[0:2]
-            emoji_dict[emoji] = description
+        with open(resource_path(emoji_lexicon), encoding='utf-8') as f:
+            for line in f:
+                fields = line.strip().split('\t')
+                if len(fields) < 2:
+                    continue
+                emoji_dict[fields[0]] = fields[1]
         return emoji_dict
 
     def polarity_scores(self, text):
@@ -247,158 +458,238 @@ class SentimentIntensityAnalyzer(object):
         Positive values are positive valence, negative value are negative
         valence.
         """
-        # convert emojis to their textual descriptions
-        text_token_list = text.split()
-        text_no_emoji_lst = []
-        for token in text_token_list:
-            if token in self.emojis:
-                # get the textual description
-                description = self.emojis[token]
-                text_no_emoji_lst.append(description)
-            else:
-                text_no_emoji_lst.append(token)
-        text = " ".join(x for x in text_no_emoji_lst)
+        # convert emojis to their textual descriptions, also inside tokens ("great😂")
+        text = self.emoji_matcher.replace(text)
 
         sentitext = SentiText(text)
+        sentiments = self._sentiments(sentitext)
+
+        valence_dict = self.score_valence(sentiments, text)
+
+        return valence_dict
+
+    def polarity_scores_batch(self, texts):
+        """
+        Score a batch of texts at once. Punctuation stripping, lowercasing and
+        the lexicon probes are done once per unique word of the batch, and the
+        final normalization runs vectorized over the whole batch.
+        Returns a float array of shape (len(texts), 4) whose columns are
+        BATCH_COLUMNS (neg, neu, pos, compound), equal to polarity_scores.
+        """
+        return self.polarity_scores_tokens([text.split() for text in texts])
 
-        sentiments = []
+    def polarity_scores_tokens(self, token_lists):
+        """
+        Same as polarity_scores_batch, for texts that the caller has already
+        split on whitespace (one list of raw tokens per text)
+        """
+        import numpy as np
+
+        replace_emojis = self.emoji_matcher.replace
+        strip_punc = SentiText._strip_punc
+        lexicon = self.lexicon
+        # whitespace-split word -> (SentiText word, lowercased word, scored by _sentiments)
+        word_cache = {}
+        sums = []
+        doc_ids = []
+        flat_sentiments = []
+        punctuation = []
+        for doc_id, tokens in enumerate(token_lists):
+            # convert emojis to their textual descriptions (the tokens are only split
+            # again when a description was inserted)
+            joined = " ".join(tokens)
+            text = replace_emojis(joined)
+            split = [we for we in (tokens if text is joined else text.split()) if len(we) > 1]
+            for we in split:
+                if we not in word_cache:
+                    word = strip_punc(we)
+                    word_lower = word.lower()
+                    word_cache[we] = (word, word_lower, word_lower in lexicon and word_lower not in BOOSTER_DICT)
+            if split:
+                words, lower, scored = zip(*[word_cache[we] for we in split])
+            else:
+                words = lower = scored = ()
+            allcap_words = sum(map(str.isupper, words))
+            sentitext = SentiText.from_words(words, lower, 0 < len(words) - allcap_words < len(words))
+            sentiments = self._sentiments(sentitext, scored)
+            sums.append(float(sum(sentiments)))
+            doc_ids.extend([doc_id] * len(sentiments))
+            flat_sentiments.extend(sentiments)
+            punctuation.append((text.count("!"), text.count("?"), len(sentiments)))
+
+        return self._score_valence_batch(np, sums, doc_ids, flat_sentiments, punctuation)
+
+    @staticmethod
+    def _score_valence_batch(np, sums, doc_ids, flat_sentiments, punctuation):
+        # vectorized score_valence over a whole batch
+        count = len(sums)
+        sentiments = np.asarray(flat_sentiments, dtype=np.float64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        ep_count, qm_count, lengths = np.asarray(punctuation, dtype=np.int64).reshape(count, 3).T
+
+        # _punctuation_emphasis
+        ep_amplifier = np.minimum(ep_count, 4) * 0.292
+        qm_amplifier = np.where(qm_count > 3, 0.96, np.where(qm_count > 1, qm_count * 0.18, 0.0))
+        amplifier = ep_amplifier + qm_amplifier
+
+        sum_s = np.asarray(sums, dtype=np.float64).reshape(count)
+        sum_s = np.where(sum_s > 0, sum_s + amplifier, np.where(sum_s < 0, sum_s - amplifier, sum_s))
+        compound = np.clip(sum_s / np.sqrt(sum_s * sum_s + 15), -1.0, 1.0)
+
+        # _sift_sentiment_scores
+        positive = sentiments > 0
+        negative = sentiments < 0
+        pos_sum = np.bincount(doc_ids[positive], weights=sentiments[positive] + 1, minlength=count)
+        neg_sum = np.bincount(doc_ids[negative], weights=sentiments[negative] - 1, minlength=count)
+        neu_count = np.bincount(doc_ids[sentiments == 0], minlength=count)
+
+        more_positive = pos_sum > np.fabs(neg_sum)
+        more_negative = pos_sum < np.fabs(neg_sum)
+        pos_sum = np.where(more_positive, pos_sum + amplifier, pos_sum)
+        neg_sum = np.where(more_negative, neg_sum - amplifier, neg_sum)
+        total = pos_sum + np.fabs(neg_sum) + neu_count
+        has_sentiments = lengths > 0
+        total = np.where(has_sentiments, total, 1.0)
+
+        scores = np.zeros((count, 4), dtype=np.float64)
+        scores[:, 0] = np.fabs(neg_sum / total)
+        scores[:, 1] = np.fabs(neu_count / total)
+        scores[:, 2] = np.fabs(pos_sum / total)
+        scores[:, 3] = compound
+        scores[~has_sentiments] = 0.0
+
+        # round exactly like score_valence (Python's correctly rounded round())
+        rounded = [[round(neg, 3), round(neu, 3), round(pos, 3), round(compound, 4)]
+                   for neg, neu, pos, compound in scores.tolist()]
+        return np.array(rounded, dtype=np.float64).reshape(count, 4)
+
+    def _sentiments(self, sentitext, scored=None):
+        # `scored` optionally flags, per position, the lexicon words that are no
+        # booster (probed once per unique word of a batch by polarity_scores_tokens)
         words_and_emoticons = sentitext.words_and_emoticons
-        for item in words_and_emoticons:
-            valence = 0
-            i = words_and_emoticons.index(item)
+        words_and_emoticons_lower = sentitext.words_and_emoticons_lower
+        if scored is None:
+            lexicon = self.lexicon
             # check for vader_lexicon words that may be used as modifiers or negations
-            if item.lower() in BOOSTER_DICT:
-                sentiments.append(valence)
+            scored = [item_lowercase in lexicon and item_lowercase not in BOOSTER_DICT
+                      for item_lowercase in words_and_emoticons_lower]
+        # words outside the lexicon are neutral whatever their context, so only
+        # the lexicon words are scored (by position: repeated words keep their own context)
+        sentiments = [0] * len(words_and_emoticons_lower)
+        phrases = None
+        for i, is_scored in enumerate(scored):
+            if not is_scored:
                 continue
-            if (i < len(words_and_emoticons) - 1 and item.lower() == "kind" and
-                    words_and_emoticons[i + 1].lower() == "of"):
-                sentiments.append(valence)
+            if phrases is None:
+                # multi-word idioms and boosters of the whole text, found once
+                phrases = self.phrase_matcher.find(words_and_emoticons_lower)
+            if phrases.get((i, 2)) == "kind of":
                 continue
+            sentiments[i] = self._valence(sentitext, words_and_emoticons[i], i, phrases)
 
-            sentiments = self.sentiment_valence(valence, sentitext, item, i, sentiments)
-
-        sentiments = self._but_check(words_and_emoticons, sentiments)
-
-        valence_dict = self.score_valence(sentiments, text)
-
-        return valence_dict
+        sentiments = self._but_check(words_and_emoticons_lower, sentiments)
+        return sentiments
 
     def sentiment_valence(self, valence, sentitext, item, i, sentiments):
-        is_cap_diff = sentitext.is_cap_diff
-        words_and_emoticons = sentitext.words_and_emoticons
-        item_lowercase = item.lower()
-        if item_lowercase in self.lexicon:
-            # get the sentiment valence
-            valence = self.lexicon[item_lowercase]
-            # check if sentiment laden word is in ALL CAPS (while others aren't)
-            if item.isupper() and is_cap_diff:
-                if valence > 0:
-                    valence += C_INCR
-                else:
-                    valence -= C_INCR
-
-            for start_i in range(0, 3):
-                # dampen the scalar modifier of preceding words and emoticons
-                # (excluding the ones that immediately preceed the item) based
-                # on their distance from the current item.
-                if i > start_i and words_and_emoticons[i - (start_i + 1)].lower() not in self.lexicon:
-                    s = scalar_inc_dec(words_and_emoticons[i - (start_i + 1)], valence, is_cap_diff)
-                    if start_i == 1 and s != 0:
-                        s = s * 0.95
-                    if start_i == 2 and s != 0:
-                        s = s * 0.9
-                    valence = valence + s
-                    valence = self._negation_check(valence, words_and_emoticons, start_i, i)
-                    if start_i == 2:
-                        valence = self._special_idioms_check(valence, words_and_emoticons, i)
-
-            valence = self._least_check(valence, words_and_emoticons, i)
+        if sentitext.words_and_emoticons_lower[i] in self.lexicon:
+            valence = self._valence(sentitext, item, i, self.phrase_matcher.find(sentitext.words_and_emoticons_lower))
         sentiments.append(valence)
         return sentiments
 
-    def _least_check(self, valence, words_and_emoticons, i):
+    def _valence(self, sentitext, item, i, phrases):
+        is_cap_diff = sentitext.is_cap_diff
+        words_and_emoticons = sentitext.words_and_emoticons
+        words_and_emoticons_lower = sentitext.words_and_emoticons_lower
+        item_lowercase = words_and_emoticons_lower[i]
+        # get the sentiment valence
+        valence = self.lexicon[item_lowercase]
+        # check if sentiment laden word is in ALL CAPS (while others aren't)
+        if item.isupper() and is_cap_diff:
+            if valence > 0:
+                valence += C_INCR
+            else:
+                valence -= C_INCR
+
+        for start_i in range(0, 3):
+            # dampen the scalar modifier of preceding words and emoticons
+            # (excluding the ones that immediately preceed the item) based
+            # on their distance from the current item.
+            if i > start_i and words_and_emoticons_lower[i - (start_i + 1)] not in self.lexicon:
+                s = scalar_inc_dec(words_and_emoticons[i - (start_i + 1)], valence, is_cap_diff)
+                if start_i == 1 and s != 0:
+                    s = s * 0.95
+                if start_i == 2 and s != 0:
+                    s = s * 0.9
+                valence = valence + s
+                valence = self._negation_check(valence, words_and_emoticons_lower, start_i, i)
+                if start_i == 2:
+                    valence = self._special_idioms_check(valence, phrases, i)
+
+        valence = self._least_check(valence, words_and_emoticons_lower, i)
+        return valence
+
+    def _least_check(self, valence, words_and_emoticons_lower, i):
         # check for negation case using "least"
-        if i > 1 and words_and_emoticons[i - 1].lower() not in self.lexicon \
-                and words_and_emoticons[i - 1].lower() == "least":
-            if words_and_emoticons[i - 2].lower() != "at" and words_and_emoticons[i - 2].lower() != "very":
+        # (expects the lowercased tokens)
+        if i > 1 and words_and_emoticons_lower[i - 1] not in self.lexicon \
+                and words_and_emoticons_lower[i - 1] == "least":
+            if words_and_emoticons_lower[i - 2] != "at" and words_and_emoticons_lower[i - 2] != "very":
                 valence = valence * N_SCALAR
-        elif i > 0 and words_and_emoticons[i - 1].lower() not in self.lexicon \
-                and words_and_emoticons[i - 1].lower() == "least":
+        elif i > 0 and words_and_emoticons_lower[i - 1] not in self.lexicon \
+                and words_and_emoticons_lower[i - 1] == "least":
             valence = valence * N_SCALAR
         return valence
 
     @staticmethod
-    def _but_check(words_and_emoticons, sentiments):
+    def _but_check(words_and_emoticons_lower, sentiments):
         # check for modification in sentiment due to contrastive conjunction 'but'
-        words_and_emoticons_lower = [str(w).lower() for w in words_and_emoticons]
+        # (expects the lowercased tokens; sentiments are updated by position)
         if 'but' in words_and_emoticons_lower:
             bi = words_and_emoticons_lower.index('but')
-            for sentiment in sentiments:
-                si = sentiments.index(sentiment)
+            for si, sentiment in enumerate(sentiments):
                 if si < bi:
-                    sentiments.pop(si)
-                    sentiments.insert(si, sentiment * 0.5)
+                    sentiments[si] = sentiment * 0.5
                 elif si > bi:
-                    sentiments.pop(si)
-                    sentiments.insert(si, sentiment * 1.5)
+                    sentiments[si] = sentiment * 1.5
         return sentiments
 
-    @staticmethod
-    def _special_idioms_check(valence, words_and_emoticons, i):
-        words_and_emoticons_lower = [str(w).lower() for w in words_and_emoticons]
-        onezero = "{0} {1}".format(words_and_emoticons_lower[i - 1], words_and_emoticons_lower[i])
-
-        twoonezero = "{0} {1} {2}".format(words_and_emoticons_lower[i - 2],
-                                          words_and_emoticons_lower[i - 1], words_and_emoticons_lower[i])
-
-        twoone = "{0} {1}".format(words_and_emoticons_lower[i - 2], words_and_emoticons_lower[i - 1])
-
-        threetwoone = "{0} {1} {2}".format(words_and_emoticons_lower[i - 3],
-                                           words_and_emoticons_lower[i - 2], words_and_emoticons_lower[i - 1])
-
-        threetwo = "{0} {1}".format(words_and_emoticons_lower[i - 3], words_and_emoticons_lower[i - 2])
-
-        sequences = [onezero, twoonezero, twoone, threetwoone, threetwo]
-
-        for seq in sequences:
-            if seq in SPECIAL_CASE_IDIOMS:
-                valence = SPECIAL_CASE_IDIOMS[seq]
+    def _special_idioms_check(self, valence, phrases, i):
+        # (expects the {(start, length): phrase} matches of the text, see PhraseMatcher)
+        if not phrases:
+            return valence
+        # onezero, twoonezero, twoone, threetwoone, threetwo: the first idiom found wins
+        for position in [(i - 1, 2), (i - 2, 3), (i - 2, 2), (i - 3, 3), (i - 3, 2)]:
+            phrase = phrases.get(position)
+            if phrase in self.idioms:
+                valence = self.idioms[phrase]
                 break
 
-        if len(words_and_emoticons_lower) - 1 > i:
-            zeroone = "{0} {1}".format(words_and_emoticons_lower[i], words_and_emoticons_lower[i + 1])
-            if zeroone in SPECIAL_CASE_IDIOMS:
-                valence = SPECIAL_CASE_IDIOMS[zeroone]
-        if len(words_and_emoticons_lower) - 1 > i + 1:
-            zeroonetwo = "{0} {1} {2}".format(words_and_emoticons_lower[i], words_and_emoticons_lower[i + 1],
-                                              words_and_emoticons_lower[i + 2])
-            if zeroonetwo in SPECIAL_CASE_IDIOMS:
-                valence = SPECIAL_CASE_IDIOMS[zeroonetwo]
+        # zeroone, zeroonetwo
+        for position in [(i, 2), (i, 3)]:
+            phrase = phrases.get(position)
+            if phrase in self.idioms:
+                valence = self.idioms[phrase]
 
         # check for booster/dampener bi-grams such as 'sort of' or 'kind of'
-        n_grams = [threetwoone, threetwo, twoone]
-        for n_gram in n_grams:
-            if n_gram in BOOSTER_DICT:
-                valence = valence + BOOSTER_DICT[n_gram]
+        for position in [(i - 3, 3), (i - 3, 2), (i - 2, 2)]:
+            phrase = phrases.get(position)
+            if phrase in BOOSTER_DICT:
+                valence = valence + BOOSTER_DICT[phrase]
         return valence
 
     @staticmethod
-    def _sentiment_laden_idioms_check(valence, senti_text_lower):
+    def _sentiment_laden_idioms_check(valence, phrases):
         # Future Work
         # check for sentiment laden idioms that don't contain a lexicon word
-        idioms_valences = []
-        for idiom in SENTIMENT_LADEN_IDIOMS:
-            if idiom in senti_text_lower:
-                print(idiom, senti_text_lower)
-                valence = SENTIMENT_LADEN_IDIOMS[idiom]
-                idioms_valences.append(valence)
+        idioms_valences = [SENTIMENT_LADEN_IDIOMS[phrase] for phrase in phrases.values()
+                           if phrase in SENTIMENT_LADEN_IDIOMS]
         if len(idioms_valences) > 0:
             valence = sum(idioms_valences) / float(len(idioms_valences))
         return valence
 
     @staticmethod
-    def _negation_check(valence, words_and_emoticons, start_i, i):
-        words_and_emoticons_lower = [str(w).lower() for w in words_and_emoticons]
+    def _negation_check(valence, words_and_emoticons_lower, start_i, i):
+        # (expects the lowercased tokens)
         if start_i == 0:
             if negated([words_and_emoticons_lower[i - (start_i + 1)]]):  # 1 word preceding lexicon word (w/o stopwords)
                 valence = valence * N_SCALAR
@@ -509,176 +800,3 @@ class SentimentIntensityAnalyzer(object):
 
         return sentiment_dict
 
-
-if __name__ == '__main__':
-    # --- examples -------
-    sentences = ["VADER is smart, handsome, and funny.",  # positive sentence example
-                 "VADER is smart, handsome, and funny!",
-                 # punctuation emphasis handled correctly (sentiment intensity adjusted)
-                 "VADER is very smart, handsome, and funny.",
-                 # booster words handled correctly (sentiment intensity adjusted)
-                 "VADER is VERY SMART, handsome, and FUNNY.",  # emphasis for ALLCAPS handled
-                 "VADER is VERY SMART, handsome, and FUNNY!!!",
-                 # combination of signals - VADER appropriately adjusts intensity
-                 "VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!",
-                 # booster words & punctuation make this close to ceiling for score
-                 "VADER is not smart, handsome, nor funny.",  # negation sentence example
-                 "The book was good.",  # positive sentence
-                 "At least it isn't a horrible book.",  # negated negative sentence with contraction
-                 "The book was only kind of good.",
-                 # qualified positive sentence is handled correctly (intensity adjusted)
-                 "The plot was good, but the characters are uncompelling and the dialog is not great.",
-                 # mixed negation sentence
-                 "Today SUX!",  # negative slang with capitalization emphasis
-                 "Today only kinda sux! But I'll get by, lol",
-                 # mixed sentiment example with slang and constrastive conjunction "but"
-                 "Make sure you :) or :D today!",  # emoticons handled
-                 "Catch utf-8 emoji such as 💘 and 💋 and 😁",  # emojis handled
-                 "Not bad at all"  # Capitalized negation
-                 ]
-
-    analyzer = SentimentIntensityAnalyzer()
-
-    print("----------------------------------------------------")
-    print(" - Analyze typical example cases, including handling of:")
-    print("  -- negations")
-    print("  -- punctuation emphasis & punctuation flooding")
-    print("  -- word-shape as emphasis (capitalization difference)")
-    print("  -- degree modifiers (intensifiers such as 'very' and dampeners such as 'kind of')")
-    print("  -- slang words as modifiers such as 'uber' or 'friggin' or 'kinda'")
-    print("  -- contrastive conjunction 'but' indicating a shift in sentiment; sentiment of later text is dominant")
-    print("  -- use of contractions as negations")
-    print("  -- sentiment laden emoticons such as :) and :D")
-    print("  -- utf-8 encoded emojis such as 💘 and 💋 and 😁")
-    print("  -- sentiment laden slang words (e.g., 'sux')")
-    print("  -- sentiment laden initialisms and acronyms (for example: 'lol') \n")
-    for sentence in sentences:
-        vs = analyzer.polarity_scores(sentence)
-        print("{:-<65} {}".format(sentence, str(vs)))
-    print("----------------------------------------------------")
-    print(" - About the scoring: ")
-    print("""  -- The 'compound' score is computed by summing the valence scores of each word in the lexicon, adjusted 
-     according to the rules, and then normalized to be between -1 (most extreme negative) and +1 (most extreme positive). 
-     This is the most useful metric if you want a single unidimensional measure of sentiment for a given sentence.  
-     Calling it a 'normalized, weighted composite score' is accurate.""")
-    print("""  -- The 'pos', 'neu', and 'neg' scores are ratios for proportions of text that fall in each category (so these   
-     should all add up to be 1... or close to it with float operation).  These are the most useful metrics if 
-     you want multidimensional measures of sentiment for a given sentence.""")
-    print("----------------------------------------------------")
-
-    # input("\nPress Enter to continue the demo...\n")  # for DEMO purposes...
-
-    tricky_sentences = ["Sentiment analysis has never been good.",
-                        "Sentiment analysis has never been this good!",
-                        "Most automated sentiment analysis tools are shit.",
-                        "With VADER, sentiment analysis is the shit!",
-                        "Other sentiment analysis tools can be quite bad.",
-                        "On the other hand, VADER is quite bad ass",
-                        "VADER is such a badass!",  # slang with punctuation emphasis
-                        "Without a doubt, excellent idea.",
-                        "Roger Dodger is one of the most compelling variations on this theme.",
-                        "Roger Dodger is at least compelling as a variation on the theme.",
-                        "Roger Dodger is one of the least compelling variations on this theme.",
-                        "Not such a badass after all.",  # Capitalized negation with slang
-                        "Without a doubt, an excellent idea."  # "without {any} doubt" as negation
-                        ]
-    print("----------------------------------------------------")
-    print(" - Analyze examples of tricky sentences that cause trouble to other sentiment analysis tools.")
-    print("  -- special case idioms - e.g., 'never good' vs 'never this good', or 'bad' vs 'bad ass'.")
-    print("  -- special uses of 'least' as negation versus comparison \n")
-    for sentence in tricky_sentences:
-        vs = analyzer.polarity_scores(sentence)
-        print("{:-<69} {}".format(sentence, str(vs)))
-    print("----------------------------------------------------")
-
-    # input("\nPress Enter to continue the demo...\n")  # for DEMO purposes...
-
-    print("----------------------------------------------------")
-    print(
-        " - VADER works best when analysis is done at the sentence level (but it can work on single words or entire novels).")
-    paragraph = "It was one of the worst movies I've seen, despite good reviews. Unbelievably bad acting!! Poor direction. VERY poor production. The movie was bad. Very bad movie. VERY BAD movie!"
-    print("  -- For example, given the following paragraph text from a hypothetical movie review:\n\t'{}'".format(
-        paragraph))
-    print(
-        "  -- You could use NLTK to break the paragraph into sentence tokens for VADER, then average the results for the paragraph like this: \n")
-    # simple example to tokenize paragraph into sentences for VADER
-    from nltk import tokenize
-
-    sentence_list = tokenize.sent_tokenize(paragraph)
-    paragraphSentiments = 0.0
-    for sentence in sentence_list:
-        vs = analyzer.polarity_scores(sentence)
-        print("{:-<69} {}".format(sentence, str(vs["compound"])))
-        paragraphSentiments += vs["compound"]
-    print("AVERAGE SENTIMENT FOR PARAGRAPH: \t" + str(round(paragraphSentiments / len(sentence_list), 4)))
-    print("----------------------------------------------------")
-
-    # input("\nPress Enter to continue the demo...\n")  # for DEMO purposes...
-
-    print("----------------------------------------------------")
-    print(" - Analyze sentiment of IMAGES/VIDEO data based on annotation 'tags' or image labels. \n")
-    conceptList = ["balloons", "cake", "candles", "happy birthday", "friends", "laughing", "smiling", "party"]
-    conceptSentiments = 0.0
-    for concept in conceptList:
-        vs = analyzer.polarity_scores(concept)
-        print("{:-<15} {}".format(concept, str(vs['compound'])))
-        conceptSentiments += vs["compound"]
-    print("AVERAGE SENTIMENT OF TAGS/LABELS: \t" + str(round(conceptSentiments / len(conceptList), 4)))
-    print("\t")
-    conceptList = ["riot", "fire", "fight", "blood", "mob", "war", "police", "tear gas"]
-    conceptSentiments = 0.0
-    for concept in conceptList:
-        vs = analyzer.polarity_scores(concept)
-        print("{:-<15} {}".format(concept, str(vs['compound'])))
-        conceptSentiments += vs["compound"]
-    print("AVERAGE SENTIMENT OF TAGS/LABELS: \t" + str(round(conceptSentiments / len(conceptList), 4)))
-    print("----------------------------------------------------")
-
-    # input("\nPress Enter to continue the demo...")  # for DEMO purposes...
-
-    do_translate = input(
-        "\nWould you like to run VADER demo examples with NON-ENGLISH text? (Note: requires Internet access) \n Type 'y' or 'n', then press Enter: ")
-    if do_translate.lower().lstrip().__contains__("y"):
-        print("\n----------------------------------------------------")
-        print(" - Analyze sentiment of NON ENGLISH text...for example:")
-        print("  -- French, German, Spanish, Italian, Russian, Japanese, Arabic, Chinese")
-        print("  -- many other languages supported. \n")
-        languages = ["English", "French", "German", "Spanish", "Italian", "Russian", "Japanese", "Arabic", "Chinese"]
-        language_codes = ["en", "fr", "de", "es", "it", "ru", "ja", "ar", "zh"]
-        nonEnglish_sentences = ["I'm surprised to see just how amazingly helpful VADER is!",
-                                "Je suis surpris de voir juste comment incroyablement utile VADER est!",
-                                "Ich bin überrascht zu sehen, nur wie erstaunlich nützlich VADER!",
-                                "Me sorprende ver sólo cómo increíblemente útil VADER!",
-                                "Sono sorpreso di vedere solo come incredibilmente utile VADER è!",
-                                "Я удивлен увидеть, как раз как удивительно полезно ВЕЙДЕРА!",
-                                "私はちょうどどのように驚くほど役に立つベイダーを見て驚いています!",
-                                "أنا مندهش لرؤية فقط كيف مثير للدهشة فيدر فائدة!",
-                                "惊讶地看到有用维德是的只是如何令人惊讶了 ！"
-                                ]
-        for sentence in nonEnglish_sentences:
-            to_lang = "en"
-            from_lang = language_codes[nonEnglish_sentences.index(sentence)]
-            if (from_lang == "en") or (from_lang == "en-US"):
-                translation = sentence
-                translator_name = "No translation needed"
-            else:  # please note usage limits for My Memory Translation Service:   http://mymemory.translated.net/doc/usagelimits.php
-                # using   MY MEMORY NET   http://mymemory.translated.net
-                api_url = "http://mymemory.translated.net/api/get?q={}&langpair={}|{}".format(sentence, from_lang,
-                                                                                              to_lang)
-                hdrs = {
-                    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.11 (KHTML, like Gecko) Chrome/23.0.1271.64 Safari/537.11',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.3',
-                    'Accept-Encoding': 'none',
-                    'Accept-Language': 'en-US,en;q=0.8',
-                    'Connection': 'keep-alive'}
-                response = requests.get(api_url, headers=hdrs)
-                response_json = json.loads(response.text)
-                translation = response_json["responseData"]["translatedText"]
-                translator_name = "MemoryNet Translation Service"
-            vs = analyzer.polarity_scores(translation)
-            print("- {: <8}: {: <69}\t {} ({})".format(languages[nonEnglish_sentences.index(sentence)], sentence,
-                                                       str(vs['compound']), translator_name))
-        print("----------------------------------------------------")
-
-    print("\n\n Demo Done!")
@@ -0,0 +1,191 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+EXECUTOR_MODES = ("auto", "inline", "thread", "process")
+
+
+def _run_shard(function, shard, kwargs):
+    # Runs in the worker: score one shard and report how long the scoring itself took
+    start = time.perf_counter()
+    result = function(shard, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ScoringExecutor(object):
+    """
+    Runs CPU-bound scoring off the asyncio event loop. A batch is split into
+    shards that are scored inline, in a thread pool or in a process pool, and
+    the per-shard results are concatenated back in input order.
+
+    In "auto" mode batches smaller than `inline_threshold` are scored inline
+    (the pool round trip would cost more than the scoring) and larger ones go
+    to the process pool.
+    """
+
+    def __init__(self, mode="auto", max_workers=None, shard_size=500, inline_threshold=200, initializer=None,
+                 timing_window=1000):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError("Unknown executor mode: {!r} (expected one of {})".format(mode, ", ".join(EXECUTOR_MODES)))
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.inline_threshold = inline_threshold
+        self.initializer = initializer
+        self._pools = {}
+        self._lock = threading.Lock()
+
+        self.queue_depth = 0  # Shards submitted to a pool and not finished yet
+        self.max_queue_depth = 0
+        self.requests = 0
+        self.texts = 0
+        self.shards = 0
+        self.shard_times = deque(maxlen=timing_window)  # Scoring time of the most recent shards, in seconds
+        self.shard_latencies = deque(maxlen=timing_window)  # Submit-to-result time, including queueing
+
+    def _pool(self, mode):
+        with self._lock:
+            if mode not in self._pools:
+                if mode == "process":
+                    self._pools[mode] = ProcessPoolExecutor(self.max_workers, initializer=self.initializer)
+                else:
+                    self._pools[mode] = ThreadPoolExecutor(self.max_workers, initializer=self.initializer)
+            return self._pools[mode]
+
+    def _discard_pool(self, mode, pool):
+        # A process pool is unusable once one of its workers died (e.g. OOM-killed): forget it so that
+        # the next batch starts a fresh one
+        with self._lock:
+            if self._pools.get(mode) is pool:
+                del self._pools[mode]
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def resolve_mode(self, count):
+        if self.mode != "auto":
+            return self.mode
+        return "inline" if count < self.inline_threshold else "process"
+
+    def split(self, items):
+        """
+        Split items into contiguous shards: at most `shard_size` items each, and
+        small enough that every worker gets one
+        """
+        size = min(self.shard_size, -(-len(items) // self.max_workers)) or 1
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    async def map(self, function, items, **kwargs):
+        """
+        Return function(items, **kwargs) computed shard by shard off the event loop.
+        `function` must take a list and return a list of per-item results; for the
+        process pool it must be a picklable module-level function.
+        """
+        items = list(items)
+        mode = self.resolve_mode(len(items))
+        with self._lock:
+            self.requests += 1
+            self.texts += len(items)
+
+        if mode == "inline" or not items:
+            result, elapsed = _run_shard(function, items, kwargs)
+            self._record(elapsed, elapsed)
+            return result
+
+        shards = self.split(items)
+        pool = self._pool(mode)
+        try:
+            parts = await self._gather(pool, function, shards, kwargs)
+        except BrokenProcessPool:
+            # Retry the batch once on a fresh pool; if that one breaks as well, it is discarded too
+            # and the error reaches the caller
+            self._discard_pool(mode, pool)
+            pool = self._pool(mode)
+            try:
+                parts = await self._gather(pool, function, shards, kwargs)
+            except BrokenProcessPool:
+                self._discard_pool(mode, pool)
+                raise
+
+        result = []
+        for part, _ in parts:
+            result.extend(part)
+        return result
+
+    async def _gather(self, pool, function, shards, kwargs):
+        loop = asyncio.get_running_loop()
+        futures = []
+        for shard in shards:
+            future = loop.run_in_executor(pool, _run_shard, function, shard, kwargs)
+            future.add_done_callback(self._shard_done(time.perf_counter()))
+            futures.append(future)
+            # Counted as soon as it is submitted: submitting to a broken pool raises part way through
+            with self._lock:
+                self.queue_depth += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        return await asyncio.gather(*futures)
+
+    def _shard_done(self, submitted):
+        def done(future):
+            with self._lock:
+                self.queue_depth -= 1
+            if not future.cancelled() and future.exception() is None:
+                self._record(future.result()[1], time.perf_counter() - submitted)
+        return done
+
+    def _record(self, elapsed, latency):
+        with self._lock:
+            self.shards += 1
+            self.shard_times.append(elapsed)
+            self.shard_latencies.append(latency)
+
+    def metrics(self):
+        """
+        Return queue depth, counters and per-shard timing statistics (in seconds)
+        """
+        with self._lock:
+            times = sorted(self.shard_times)
+            latencies = sorted(self.shard_latencies)
+            metrics = {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "texts": self.texts,
+                "shards": self.shards,
+            }
+        for name, values in [("shard_time", times), ("shard_latency", latencies)]:
+            metrics[name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values) if values else None,
+                "p50": _percentile(values, 0.5) if values else None,
+                "p95": _percentile(values, 0.95) if values else None,
+                "max": values[-1] if values else None,
+            }
+        return metrics
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+
+def executor_from_env(initializer=None):
+    """
+    Build an executor configured by SPEAKBRIGHT_EXECUTOR (auto, inline, thread or process),
+    SPEAKBRIGHT_WORKERS, SPEAKBRIGHT_SHARD_SIZE and SPEAKBRIGHT_INLINE_THRESHOLD
+    """
+    workers = os.environ.get("SPEAKBRIGHT_WORKERS")
+    return ScoringExecutor(mode=os.environ.get("SPEAKBRIGHT_EXECUTOR", "auto"),
+                           max_workers=int(workers) if workers else None,
+                           shard_size=int(os.environ.get("SPEAKBRIGHT_SHARD_SIZE", 500)),
+                           inline_threshold=int(os.environ.get("SPEAKBRIGHT_INLINE_THRESHOLD", 200)),
+                           initializer=initializer)
@@ -0,0 +1,308 @@
+"""
+Compiled binary lexicon cache.
+
+All lexicons are written into one versioned artifact that worker processes
+open with mmap, so N workers share a single page-cache copy and skip text
+parsing at startup. The artifact records the size and modification time of
+every source file and is rebuilt automatically when one of them changes.
+
+Layout (native byte order, sections aligned to 8 bytes):
+
+    magic (8 bytes) | format version (u4) | header length (u4) | payload crc32 (u4) | reserved (u4)
+    header: UTF-8 JSON describing the sources and the sections of every table
+    payload: the table sections
+
+Every table is a string table: NUL-terminated UTF-8 keys plus a u4 offset
+array. Tables used for lookups are sorted by their UTF-8 bytes so that keys
+can be found by binary search directly in the mapping. Depending on its kind
+a table also carries values:
+
+    strings  no values (an ordered list of strings)
+    text     NUL-terminated UTF-8 values plus a u4 offset array
+    float    one f8 per key
+    ints     a CSR list of u4 per key (u4 indptr of count + 1, u4 values)
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+
+MAGIC = b"SBLEXC\x00\x01"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("=8sIIII")
+ALIGNMENT = 8
+
+
+def source_stamps(sources):
+    """
+    Return the size and modification time of every source file
+    """
+    stamps = {}
+    for name, path in sources.items():
+        stat = os.stat(path)
+        stamps[name] = {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return stamps
+
+
+class _Writer(object):
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, data):
+        padding = -self.size % ALIGNMENT
+        if padding:
+            self.chunks.append(b"\0" * padding)
+            self.size += padding
+        offset = self.size
+        data = bytes(data)
+        self.chunks.append(data)
+        self.size += len(data)
+        return [offset, len(data)]
+
+    def add_strings(self, strings):
+        blob = bytearray()
+        offsets = array("I", [0])
+        for string in strings:
+            blob += string.encode("utf-8") + b"\0"
+            offsets.append(len(blob))
+        return self.add(blob), self.add(offsets.tobytes())
+
+
+def serialize(tables, sources=None, version=0):
+    """
+    Serialize tables into the artifact format. `tables` maps a table name to a
+    (kind, data) pair: a list of strings for "strings", otherwise a dict whose
+    values are strings ("text"), floats ("float") or sequences of ints ("ints").
+    """
+    writer = _Writer()
+    specs = {}
+    for name, (kind, data) in tables.items():
+        if kind == "strings":
+            keys = list(data)
+        else:
+            keys = sorted(data, key=lambda key: key.encode("utf-8"))
+        spec = {"kind": kind, "count": len(keys), "sorted": kind != "strings"}
+        spec["keys"], spec["key_offsets"] = writer.add_strings(keys)
+        if kind == "text":
+            spec["values"], spec["value_offsets"] = writer.add_strings(data[key] for key in keys)
+        elif kind == "float":
+            spec["values"] = writer.add(array("d", (data[key] for key in keys)).tobytes())
+        elif kind == "ints":
+            indptr = array("I", [0])
+            values = array("I")
+            for key in keys:
+                values.extend(data[key])
+                indptr.append(len(values))
+            spec["value_indptr"] = writer.add(indptr.tobytes())
+            spec["values"] = writer.add(values.tobytes())
+        elif kind != "strings":
+            raise ValueError("Unknown table kind: {!r}".format(kind))
+        specs[name] = spec
+
+    payload = b"".join(writer.chunks)
+    header = json.dumps({"version": version, "byteorder": sys.byteorder,
+                         "sources": source_stamps(sources or {}), "tables": specs}).encode("utf-8")
+    header += b" " * (-(PREAMBLE.size + len(header)) % ALIGNMENT)
+    return PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header), zlib.crc32(payload), 0) + header + payload
+
+
+def write_cache(path, tables, sources=None, version=0):
+    """
+    Write the artifact atomically, so that concurrent workers never see a partial file
+    """
+    data = serialize(tables, sources, version)
+    tmp_path = "{}.tmp.{}".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return data
+
+
+class _KeyView(object):
+    # Sequence over the raw keys of a table, so that bisect can search the mapping directly
+    def __init__(self, table):
+        self._table = table
+
+    def __len__(self):
+        return len(self._table)
+
+    def __getitem__(self, i):
+        return self._table._key_bytes(i)
+
+
+class MappedTable(object):
+    """
+    Read-only, dict-like view of one table of the artifact. Lookups binary
+    search the (possibly memory-mapped) buffer without building any Python
+    containers; to_dict() materializes the table when per-process lookup speed
+    matters more than memory.
+    """
+
+    def __init__(self, buffer, spec):
+        self.kind = spec["kind"]
+        self._buffer = buffer
+        self._count = spec["count"]
+        self._sorted = spec["sorted"]
+        self._keys = self._section(spec["keys"])
+        self._key_offsets = self._section(spec["key_offsets"]).cast("I")
+        if self.kind == "text":
+            self._values = self._section(spec["values"])
+            self._value_offsets = self._section(spec["value_offsets"]).cast("I")
+        elif self.kind == "float":
+            self._values = self._section(spec["values"]).cast("d")
+        elif self.kind == "ints":
+            self._value_indptr = self._section(spec["value_indptr"]).cast("I")
+            self._values = self._section(spec["values"]).cast("I")
+
+    def _section(self, location):
+        offset, length = location
+        return self._buffer[offset:offset + length]
+
+    def __len__(self):
+        return self._count
+
+    def _key_bytes(self, i):
+        return self._keys[self._key_offsets[i]:self._key_offsets[i + 1] - 1].tobytes()
+
+    def _value(self, i):
+        if self.kind == "text":
+            return self._values[self._value_offsets[i]:self._value_offsets[i + 1] - 1].tobytes().decode("utf-8")
+        if self.kind == "float":
+            return self._values[i]
+        if self.kind == "ints":
+            return tuple(self._values[self._value_indptr[i]:self._value_indptr[i + 1]])
+        raise TypeError("{} table has no values".format(self.kind))
+
+    def index(self, key):
+        """
+        Return the position of `key` in the table, or -1
+        """
+        if not self._sorted:
+            raise TypeError("lookups need a sorted table")
+        raw = key.encode("utf-8")
+        i = bisect_left(_KeyView(self), raw)
+        if i < self._count and self._key_bytes(i) == raw:
+            return i
+        return -1
+
+    def get(self, key, default=None):
+        i = self.index(key)
+        return default if i < 0 else self._value(i)
+
+    def __contains__(self, key):
+        return self.index(key) >= 0
+
+    def __getitem__(self, key):
+        i = self.index(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._value(i)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return self._keys.tobytes().decode("utf-8").split("\0")[:-1]
+
+    def values(self):
+        if self.kind == "text":
+            return self._values.tobytes().decode("utf-8").split("\0")[:-1]
+        if self.kind == "float":
+            return self._values.tolist()
+        if self.kind == "ints":
+            values = self._values.tolist()
+            indptr = self._value_indptr.tolist()
+            return [tuple(values[indptr[i]:indptr[i + 1]]) for i in range(self._count)]
+        raise TypeError("{} table has no values".format(self.kind))
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def arrays(self):
+        """
+        Return the raw (indptr, values) buffers of an "ints" table, for zero-copy
+        use with numpy.frombuffer
+        """
+        if self.kind != "ints":
+            raise TypeError("only ints tables have CSR arrays")
+        return self._value_indptr, self._values
+
+
+class LexiconCache(object):
+    """
+    An opened artifact: a memory-mapped file, or the serialized bytes when the
+    artifact could not be written to disk.
+    """
+
+    def __init__(self, buffer, path=None):
+        self.path = path
+        self._buffer = memoryview(buffer)
+        if len(self._buffer) < PREAMBLE.size:
+            raise ValueError("lexicon cache is truncated")
+        magic, format_version, header_length, checksum, _ = PREAMBLE.unpack_from(self._buffer)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("not a lexicon cache of format version {}".format(FORMAT_VERSION))
+        header_end = PREAMBLE.size + header_length
+        if header_end > len(self._buffer):
+            raise ValueError("lexicon cache is truncated")
+        self.header = json.loads(self._buffer[PREAMBLE.size:header_end].tobytes().decode("utf-8"))
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError("lexicon cache was built with another byte order")
+        payload = self._buffer[header_end:]
+        if zlib.crc32(payload) != checksum:
+            raise ValueError("lexicon cache checksum mismatch")
+        self._tables = {name: MappedTable(payload, spec) for name, spec in self.header["tables"].items()}
+
+    def __contains__(self, name):
+        return name in self._tables
+
+    def table(self, name):
+        return self._tables[name]
+
+    def is_current(self, sources, version=0):
+        """
+        Check that the artifact was built by this table version from the current source files
+        """
+        try:
+            return self.header["version"] == version and self.header["sources"] == source_stamps(sources)
+        except OSError:
+            return False
+
+
+def open_cache(path):
+    """
+    Memory-map an artifact. Raises OSError if it is missing and ValueError if it is invalid.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return LexiconCache(mapping, path)
+
+
+def load_or_build(path, sources, build_tables, version=0):
+    """
+    Open the artifact at `path`, rebuilding it first when it is missing, invalid,
+    of another version or older than one of `sources`. `build_tables` returns
+    the tables to serialize. When the artifact cannot be written, the freshly
+    serialized bytes are used from memory instead.
+    """
+    try:
+        cache = open_cache(path)
+        if cache.is_current(sources, version):
+            return cache
+    except (OSError, ValueError):
+        pass
+
+    tables = build_tables()
+    try:
+        write_cache(path, tables, sources, version)
+        return open_cache(path)
+    except OSError:
+        return LexiconCache(serialize(tables, sources, version))
@@ -159,80 +159,797 @@
 import os
 import re
 import sys
-import spacy
 import json
-from fastapi import FastAPI, Request
+from concurrent.futures.process import BrokenProcessPool
+from itertools import accumulate, chain, islice
+import numpy as np
+from fastapi import FastAPI, Request, WebSocket
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 
-app = FastAPI()
-
-nlp = spacy.load('en_core_web_sm')  
-
-GI_list = open('data_files/inquirerbasic.txt', 'r').readlines() 
-GI_dict = {}
-
-for line in GI_list:
-    entries = line.split("\t")  # Split each line by tabs into different entries
-    GI_dict[entries[0]] = set(entries[1:])  # First entry is the key, rest are values in a set
+import lexicon_cache
+from executor import executor_from_env
+from result_cache import cache_from_env
+from responses import NDJSONStreamingResponse, build_response, dumps, dumps_lines, validate_format
+from resources import registry
 
+app = FastAPI()
 
-lemma_list = open('data_files/e_lemma_py_format_lower.txt', 'r').readlines()
-lemma_dict = {}
 
-for line in lemma_list:
-    if line[0] == '#':  # Skip lines starting with '#' as they are comments
-        continue
-    entries = line.split()  # Split line by spaces
-    for word in entries:
-        lemma_dict[word] = entries[0]  # Assign the first word as the lemma for all subsequent words
+# Lexicons and models are registered here and only loaded on first use (or by warm_up),
+# so importing this module does no file or model loading at all.
+
+# Compiled lexicon artifact shared by all workers through mmap (see lexicon_cache.py).
+# It is rebuilt automatically when one of the source files changes.
+LEXICON_CACHE_PATH = 'data_files/lexicons.bin'
+LEXICON_SOURCES = {
+    "inquirerbasic": 'data_files/inquirerbasic.txt',
+    "lemma": 'data_files/e_lemma_py_format_lower.txt',
+    "vader": 'data_files/vader_lexicon.txt',
+    "emoji": 'data_files/emoji_utf8_lexicon.txt',
+    "positive_words": 'data_files/positive_words.txt',
+    "negative_words": 'data_files/negative_words.txt',
+}
+LEXICON_TABLES_VERSION = 2  # Bump whenever build_lexicon_tables changes what it writes
+# Hu & Liu opinion lexicon: positive and negative opinion words, scored as two more categories of the GI index
+OPINION_SOURCES = {'Positive_HuLiu': LEXICON_SOURCES["positive_words"],
+                   'Negative_HuLiu': LEXICON_SOURCES["negative_words"]}
+# Geneva Affect Label Coder: 36 emotion categories and positive/negative, as wildcard patterns (admir*)
+GALC_SOURCE = 'data_files/affective_list.txt'
+# ANEW (Affective Norms for English Words): valence, arousal and dominance ratings (1-9) of about 1k words
+ANEW_SOURCE = 'data_files/affective_norms.txt'
+# SenticNet: pleasantness, attention, sensitivity, aptitude and polarity (-1 to 1) of 13.7k concepts,
+# many of them multi-word ("a little")
+SENTICNET_SOURCE = 'data_files/senticnet_data.txt'
+
+# Lemmatizer of the GI categories. "dictionary" looks the lemmas up in the static lemma list (folded into
+# GI_index), "spacy" takes context-aware lemmas ("saw" the noun vs the verb) from en_core_web_sm, run over
+# every batch at once with nlp.pipe. SPEAKBRIGHT_SPACY_BATCH_SIZE and SPEAKBRIGHT_SPACY_PROCESSES are passed
+# to nlp.pipe; keep the processes at 1 under a process executor or bulk_score.py with several workers.
+LEMMATIZERS = ("dictionary", "spacy")
+lemmatizer = os.environ.get("SPEAKBRIGHT_LEMMATIZER", "dictionary")
+if lemmatizer not in LEMMATIZERS:
+    raise ValueError("Unknown lemmatizer: {!r} (expected one of {})".format(lemmatizer, ", ".join(LEMMATIZERS)))
+SPACY_BATCH_SIZE = int(os.environ.get("SPEAKBRIGHT_SPACY_BATCH_SIZE", 256))
+SPACY_PROCESSES = int(os.environ.get("SPEAKBRIGHT_SPACY_PROCESSES", 1))
+
+def read_GI_dict():
+    GI_list = open(LEXICON_SOURCES["inquirerbasic"], 'r').readlines()
+    GI_dict = {}
+
+    for line in GI_list:
+        entries = line.split("\t")  # Split each line by tabs into different entries
+        GI_dict[entries[0]] = set(entries[1:])  # First entry is the key, rest are values in a set
+
+    # The opinion words go into the same index, so they are counted in the same pass over the tokens
+    for key, path in OPINION_SOURCES.items():
+        with open(path, 'r', encoding='utf-8') as f:
+            GI_dict[key] = {line.strip() for line in f if line.strip()}
+    return GI_dict
+
+def read_lemma_dict():
+    lemma_list = open(LEXICON_SOURCES["lemma"], 'r').readlines()
+    lemma_dict = {}
+
+    for line in lemma_list:
+        if line[0] == '#':  # Skip lines starting with '#' as they are comments
+            continue
+        entries = line.split()  # Split line by spaces
+        for word in entries:
+            lemma_dict[word] = entries[0]  # Assign the first word as the lemma for all subsequent words
+    return lemma_dict
+
+def read_GALC_dict():
+    GALC_dict = {}
+    with open(GALC_SOURCE, 'r') as f:
+        for line in f:
+            entries = line.rstrip("\n").split("\t")
+            GALC_dict[entries[0]] = entries[1:]  # Category key, then its word and wildcard patterns
+    return GALC_dict
+
+def read_ANEW_norms():
+    ANEW_norms = {}
+    with open(ANEW_SOURCE, 'r') as f:
+        for line in f:
+            if line[0] == '#':  # Skip the header line
+                continue
+            entries = line.split("\t")
+            ANEW_norms[entries[0]] = tuple(float(entry) for entry in entries[1:4])  # Valence, arousal, dominance
+    return ANEW_norms
+
+def read_SenticNet():
+    SenticNet = {}
+    with open(SENTICNET_SOURCE, 'r') as f:
+        for line in f:
+            if line[0] == '#':  # Skip the header line
+                continue
+            entries = line.rstrip("\n").split("\t")
+            # Concepts are matched against lowercased tokens (the list spells one of them "FALSE")
+            SenticNet[entries[0].lower()] = tuple(float(entry) for entry in entries[1:6])
+    return SenticNet
+
+# Function to parse every source lexicon into the tables stored in the compiled artifact
+def build_lexicon_tables():
+    from data_files.vaderSentiment import SentimentIntensityAnalyzer
+
+    GI_dict = read_GI_dict()
+    lemma_dict = read_lemma_dict()
+    analyzer = SentimentIntensityAnalyzer(LEXICON_SOURCES["vader"], LEXICON_SOURCES["emoji"])
+    return {
+        "GI_categories": ("strings", list(GI_dict)),
+        "GI_index": ("ints", build_category_index(GI_dict, lemma_dict)),
+        "lemma_dict": ("text", lemma_dict),
+        "vader_lexicon": ("float", analyzer.lexicon),
+        "emoji_lexicon": ("text", analyzer.emojis),
+    }
+
+# Function to (re)build the compiled lexicon artifact ahead of deployment
+def compile_lexicons(path=LEXICON_CACHE_PATH):
+    lexicon_cache.write_cache(path, build_lexicon_tables(), LEXICON_SOURCES, LEXICON_TABLES_VERSION)
+
+# SPEAKBRIGHT_LEXICON_CACHE overrides the artifact path, "off" parses the text files instead (None)
+def lexicon_cache_path():
+    path = os.environ.get("SPEAKBRIGHT_LEXICON_CACHE", LEXICON_CACHE_PATH)
+    return None if path.lower() in ("", "0", "off") else path
+
+def load_lexicon_cache():
+    path = lexicon_cache_path()
+    if path is None:
+        return None
+    return lexicon_cache.load_or_build(path, LEXICON_SOURCES, build_lexicon_tables, LEXICON_TABLES_VERSION)
+
+# Function to list what a cache-backed loader reads: the compiled cache, and with the cache off the
+# resources it is built from, so that they are loaded (and timed) before it
+def lexicon_requires(*names):
+    return ["lexicon_cache"] + (list(names) if lexicon_cache_path() is None else [])
+
+def load_nlp():
+    import spacy
+    # Only the tagger and the lemmatizer are needed: skip dependency parsing and named entities
+    return spacy.load('en_core_web_sm', disable=["parser", "ner"])
+
+def load_lemma_dict():
+    cache = registry.get("lexicon_cache")
+    if cache is None:
+        return read_lemma_dict()
+    # Only read when indexes are built: look the lemmas up in the shared mapping instead of copying it
+    return cache.table("lemma_dict")
+
+def load_GI_categories():
+    cache = registry.get("lexicon_cache")
+    if cache is None:
+        return list(registry.get("GI_dict"))
+    return cache.table("GI_categories").keys()
+
+def load_GI_index():
+    return CategoryIndex(*registry.get("GI_term_matrix"))
+
+def load_GI_term_matrix():
+    cache = registry.get("lexicon_cache")
+    if cache is None:
+        return build_term_matrix(build_category_index(registry.get("GI_dict"), registry.get("lemma_dict")))
+    # The cached index already is a CSR matrix over its sorted vocabulary: share its arrays without copying
+    table = cache.table("GI_index")
+    indptr, categories = table.arrays()
+    vocabulary_ids = {word: term_id for term_id, word in enumerate(table.keys())}
+    return vocabulary_ids, np.frombuffer(indptr, dtype=np.uint32), np.frombuffer(categories, dtype=np.uint32)
+
+def load_vader_analyzer():
+    from data_files.vaderSentiment import SentimentIntensityAnalyzer
+
+    cache = registry.get("lexicon_cache")
+    if cache is None:
+        return SentimentIntensityAnalyzer(LEXICON_SOURCES["vader"], LEXICON_SOURCES["emoji"])
+    return SentimentIntensityAnalyzer(lexicon=cache.table("vader_lexicon").to_dict(),
+                                      emojis=cache.table("emoji_lexicon").to_dict())
+
+
+# Emotion categories reported by default, in output order
+NRC_CATEGORIES = ['Anger_NRC', 'Anticipation_NRC', 'Disgust_NRC', 'Fear_NRC', 'Joy_NRC',
+                  'Negative_NRC', 'Positive_NRC', 'Sadness_NRC', 'Surprise_NRC', 'Trust_NRC']
+# ANEW columns: the mean valence, arousal and dominance of the rated words of a text, then the same sums
+# weighted by coverage (divided by the number of words, so texts with few rated words score lower)
+ANEW_CATEGORIES = ['Valence_ANEW', 'Arousal_ANEW', 'Dominance_ANEW',
+                   'Valence_Weighted_ANEW', 'Arousal_Weighted_ANEW', 'Dominance_Weighted_ANEW']
+# SenticNet columns: the mean of every dimension over the concepts found in a text
+SENTICNET_CATEGORIES = ['Pleasantness_SenticNet', 'Attention_SenticNet', 'Sensitivity_SenticNet',
+                        'Aptitude_SenticNet', 'Polarity_SenticNet']
+# Optional VADER valence columns, appended after the category columns (same order as BATCH_COLUMNS)
+VADER_HEADERS = ['Negative_VADER', 'Neutral_VADER', 'Positive_VADER', 'Compound_VADER']
+
+
+# Build an inverted index from each word form to the ids of the GI categories it counts towards.
+# A word counts for a category if the word itself or its lemma is listed there, so both lookups
+# are folded into one tuple of category ids per surface form and scoring needs a single probe per token.
+def build_category_index(list_dict, lemmas):
+    word_categories = {}
+    for category_id, key in enumerate(list_dict):
+        for word in list_dict[key]:
+            word_categories.setdefault(word, set()).add(category_id)
+
+    index = {word: set(ids) for word, ids in word_categories.items()}
+    for word, lemma in lemmas.items():
+        if lemma in word_categories:
+            index[word] = index.get(word, set()) | word_categories[lemma]
+
+    return {word: tuple(sorted(ids)) for word, ids in index.items()}
+
+
+# Function to turn a GI category key into its output header
+def category_header(key):
+    if "NRC" in key:
+        key = key.replace("NRC", "EmoLex")
+    return key
+
+# Function to map GI keys, and their output headers, to category ids
+def build_category_ids(categories):
+    category_ids = {category_header(key): category_id for category_id, key in enumerate(categories)}
+    category_ids.update((key, category_id) for category_id, key in enumerate(categories))
+    return category_ids
+
+# Build the term x category matrix in CSR form: the categories of vocabulary term i are
+# term_categories[term_indptr[i]:term_indptr[i + 1]]
+def build_term_matrix(index):
+    vocabulary = list(index)
+    vocabulary_ids = {word: term_id for term_id, word in enumerate(vocabulary)}
+    term_indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    term_indptr[1:] = np.cumsum([len(index[word]) for word in vocabulary])
+    term_categories = np.fromiter((category_id for word in vocabulary for category_id in index[word]),
+                                  dtype=np.int64, count=int(term_indptr[-1]))
+    return vocabulary_ids, term_indptr, term_categories
+
+
+class CategoryIndex(object):
+    """
+    Read-only word -> category ids mapping over the CSR term x category matrix.
+    Only the word -> term id dict is built in every process; the category ids
+    are read from the indptr and values arrays, which the lexicon cache shares
+    between processes through mmap.
+    """
+
+    def __init__(self, vocabulary_ids, term_indptr, term_categories):
+        self.vocabulary_ids = vocabulary_ids
+        self._indptr = memoryview(term_indptr)
+        self._categories = memoryview(term_categories)
+
+    def __len__(self):
+        return len(self.vocabulary_ids)
+
+    def __iter__(self):
+        return iter(self.vocabulary_ids)
+
+    def __contains__(self, word):
+        return word in self.vocabulary_ids
+
+    def __getitem__(self, word):
+        term_id = self.vocabulary_ids[word]
+        return tuple(self._categories[self._indptr[term_id]:self._indptr[term_id + 1]])
+
+    def get(self, word, default=None):
+        term_id = self.vocabulary_ids.get(word)
+        if term_id is None:
+            return default
+        return tuple(self._categories[self._indptr[term_id]:self._indptr[term_id + 1]])
+
+    def items(self):
+        return ((word, self[word]) for word in self.vocabulary_ids)
+
+    def count(self, words, counts):
+        """
+        Add 1 to counts[category_id] for every category of every word, reading the shared arrays directly
+        """
+        get_term_id = self.vocabulary_ids.get
+        indptr, categories = self._indptr, self._categories
+        for word in words:
+            term_id = get_term_id(word)
+            if term_id is not None:
+                for category_id in categories[indptr[term_id]:indptr[term_id + 1]]:
+                    counts[category_id] += 1
+        return counts
+
+# Compile wildcard patterns into one character trie. A pattern ending in "*" matches every word that
+# starts with it and is stored in the trie: node[None] holds the ids of the categories whose patterns
+# end at that node. Other patterns only match the word itself and go to a plain dict.
+def build_wildcard_index(list_dict):
+    root = {}
+    words = {}
+    for category_id, key in enumerate(list_dict):
+        for pattern in list_dict[key]:
+            if pattern.endswith("*"):
+                node = root
+                for char in pattern[:-1]:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, set()).add(category_id)
+            else:
+                words.setdefault(pattern, set()).add(category_id)
+
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        if None in node:
+            node[None] = tuple(sorted(node[None]))
+        nodes.extend(child for char, child in node.items() if char is not None)
+    return root, {word: tuple(sorted(ids)) for word, ids in words.items()}
+
+# Build the ANEW lookup: word id of every surface form, through its lemma when the form itself is not
+# rated (the same fallback as ListDict_counter), and the norms as an int64 (word, dimension) array in
+# hundredths of a point, so per-text sums are exact whatever the order they are added in
+def build_norm_index(norms, lemmas):
+    word_ids = {word: word_id for word_id, word in enumerate(norms)}
+    index = dict(word_ids)
+    for word, lemma in lemmas.items():
+        if word not in index and lemma in word_ids:
+            index[word] = word_ids[lemma]
+    matrix = np.rint(np.array(list(norms.values()), dtype=np.float64).reshape(len(norms), 3) * 100).astype(np.int64)
+    return index, matrix
+
+# Compile the SenticNet concepts into a token trie: every concept is a path of words and node[None]
+# holds the id of the concept ending at that node. The dimensions are kept as an int16 (concept,
+# dimension) array in thousandths, a tenth of the size of the tuples and exact to sum.
+def build_concept_index(concepts):
+    root = {}
+    for concept_id, concept in enumerate(concepts):
+        node = root
+        for word in concept.split():
+            node = node.setdefault(word, {})
+        node[None] = concept_id
+    matrix = np.rint(np.array(list(concepts.values()), dtype=np.float64).reshape(len(concepts), 5) * 1000)
+    return root, matrix.astype(np.int16)
+
+# Function to find the longest concept starting at tokens[start] in one walk down the trie.
+# Returns (concept id, end position), or None when no concept starts there.
+def match_concept(root, tokens, start):
+    node, match = root, None
+    for end in range(start, len(tokens)):
+        node = node.get(tokens[end])
+        if node is None:
+            break
+        if None in node:
+            match = (node[None], end + 1)
+    return match
+
+# Function to find the concepts of a token list from left to right, taking the longest concept that
+# starts at each position: one walk down the trie per match attempt, no n-gram enumeration
+def match_concepts(root, tokens):
+    concept_ids = []
+    start = 0
+    while start < len(tokens):
+        match = match_concept(root, tokens, start)
+        if match is None:
+            start += 1
+        else:
+            concept_ids.append(match[0])
+            start = match[1]
+    return concept_ids
+
+# Function to find the categories of a word in one walk down the wildcard trie, O(len(word))
+def match_wildcards(index, word):
+    root, words = index
+    category_ids = set(words.get(word, ()))
+    node = root
+    for char in word:
+        node = node.get(char)
+        if node is None:
+            break
+        if None in node:
+            category_ids.update(node[None])
+    return category_ids
+
+
+registry.register("lexicon_cache", load_lexicon_cache)
+registry.register("nlp", load_nlp)
+registry.register("GI_dict", read_GI_dict)
+registry.register("lemma_dict", load_lemma_dict, requires=["lexicon_cache"])
+# Category names, position is the category id
+registry.register("GI_categories", load_GI_categories, requires=lexicon_requires("GI_dict"))
+registry.register("GI_category_ids", lambda: build_category_ids(registry.get("GI_categories")),
+                  requires=["GI_categories"])
+registry.register("GI_index", load_GI_index, requires=["GI_term_matrix"])
+registry.register("GI_term_matrix", load_GI_term_matrix, requires=lexicon_requires("GI_dict", "lemma_dict"))
+registry.register("vader_analyzer", load_vader_analyzer, requires=["lexicon_cache"])
+registry.register("GALC_dict", read_GALC_dict)
+registry.register("GALC_categories", lambda: list(registry.get("GALC_dict")), requires=["GALC_dict"])
+registry.register("GALC_category_ids", lambda: {key: category_id for category_id, key
+                                                in enumerate(registry.get("GALC_categories"))},
+                  requires=["GALC_categories"])
+registry.register("GALC_index", lambda: build_wildcard_index(registry.get("GALC_dict")), requires=["GALC_dict"])
+registry.register("ANEW_norms", read_ANEW_norms)
+registry.register("ANEW_index", lambda: build_norm_index(registry.get("ANEW_norms"), registry.get("lemma_dict")),
+                  requires=["ANEW_norms", "lemma_dict"])
+registry.register("SenticNet_index", lambda: build_concept_index(read_SenticNet()))
+# Categories of the words themselves, without the lemma list, for the spaCy lemmatizer
+registry.register("GI_word_index", lambda: build_category_index(registry.get("GI_dict"), {}), requires=["GI_dict"])
+
+# Resources needed to serve /Emotion-Analysis/, loaded by warm_up() when no names are given
+SCORING_RESOURCES = ["GI_categories", "GI_category_ids", "GI_index", "GI_term_matrix"]
+if lemmatizer == "spacy":
+    SCORING_RESOURCES += ["nlp", "GI_word_index"]
+
+
+# The lexicons used to be module globals; keep main.GI_dict, main.lemma_dict, ... working
+def __getattr__(name):
+    if name in registry:
+        return registry.get(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+# Function to load resources ahead of the first request and report their load statistics
+def warm_up(names=None):
+    return registry.warm_up(SCORING_RESOURCES if names is None else names)
+
+
+# Executor that shards large batches across worker processes (configured through the environment,
+# see executor.py). Workers load the scoring resources when they start.
+scoring_executor = executor_from_env(initializer=warm_up)
+
+# Scores of repeated utterances, cached in the process that receives the texts (configured through the
+# environment, see result_cache.py). Lookups happen before texts are sent to the executor, so one cache
+# serves every worker and the workers only score the texts that missed.
+result_cache = cache_from_env()
+
+# Batches with at least this many texts are scored with the vectorized matrix path (see benchmark.py)
+BATCH_VECTORIZE_THRESHOLD = 32
+
+PUNCTUATION = ".!?',:;\""
+SMART_QUOTES = re.compile("‘|’")
 
 
 # Main function to process a list of texts
-def process_text_list(text_list):
-    result = []
-    punctuation = ".!?',:;\""
-
-    for text in text_list:
-        variable_list = []
-        header_list = ["nwords"]  # Initialize headers with word count
-
-        # Replace both types of smart quotes with straight quotes
-        text = re.sub("‘|’", "'", text)  
-        nwords = len(text.split())  #
+def process_text_list(text_list, categories=None, vectorize=None, vader=False):
+    result = score_text_list(text_list, categories, vectorize, vader)
 
+    # Convert the result into JSON
+    return json.dumps(result, indent=4)
 
-        pre_text = text.lower().split()
-        # Remove punctuation from the start and end of each word
-        text_2 = [word.strip(punctuation) for word in pre_text if word.strip(punctuation)]
-
-        # Run the NRC emotion analysis
-        run_nrc(text_2, variable_list, header_list)
-
+# Generator variant of process_text_list: scores any iterable of texts in bounded chunks and
+# yields one result dict per text, so memory does not grow with the number of texts
+def iter_process_text_list(texts, categories=None, chunk_size=1000, vader=False):
+    texts = iter(texts)
+    while True:
+        chunk = list(islice(texts, chunk_size))
+        if not chunk:
+            return
+        yield from score_text_list(chunk, categories, vader=vader)
+
+# Function to score a list of texts into one result dict per text
+def score_text_list(text_list, categories=None, vectorize=None, vader=False):
+    header_list = result_headers(categories, vader)
+    result = score_cached_rows(text_list, categories, vectorize, vader)
+    for row in result:
+        row["headers"] = list(header_list)  # Emotion categories
+    return result
+
+# Function to score a list of texts into {"sentence", "nwords", "data"} rows, without headers.
+# With vader=True the VADER valence scores are appended to the data of every row; both scorers
+# share one normalization and whitespace split of each text.
+def score_text_rows(text_list, categories=None, vectorize=None, vader=False):
+    result = []
+    categories = resolve_categories(categories)
+
+    if vectorize is None:
+        vectorize = len(text_list) >= BATCH_VECTORIZE_THRESHOLD
+
+    tokenized = [tokenize_text(text) for text in text_list]
+    token_lists = [tokens for _, _, tokens in tokenized]
+    # GALC, ANEW and SenticNet categories are scored by their own lexicons, the others through the GI word index
+    GI_keys = [key for key in categories if category_family(key) == "GI"]
+
+    if not GI_keys:
+        rows = [[] for _ in token_lists]
+    elif lemmatizer == "spacy":
+        GI_category_ids = registry.get("GI_category_ids")
+        lemma_lists = spacy_lemmas([[word.strip(PUNCTUATION) for word in words if word.strip(PUNCTUATION)]
+                                    for _, words, _ in tokenized])
+        rows = score_lemmatized(token_lists, lemma_lists, [GI_category_ids[key] for key in GI_keys])
+    elif vectorize:
+        rows = score_batch(token_lists, GI_keys)
+    else:
+        # Run the emotion analysis text by text
+        GI_category_ids = registry.get("GI_category_ids")
+        category_ids = [GI_category_ids[key] for key in GI_keys]
+        rows = [score_tokens(tokens, category_ids) for tokens in token_lists]
+
+    if len(GI_keys) < len(categories):
+        rows = add_family_scores(token_lists, categories, rows)
+
+    if vader:
+        # VADER works on the words as written, with their case and punctuation
+        valences = registry.get("vader_analyzer").polarity_scores_tokens([words for _, words, _ in tokenized])
+        for variable_list, valence in zip(rows, valences.tolist()):
+            variable_list.extend(valence)
+
+    for (text, words, _), variable_list in zip(tokenized, rows):
         # Append the result for each text
         result.append({
             "sentence": text,
-            "nwords": nwords,
-            "data": variable_list,  # Emotion scores
-            "headers": header_list  # Emotion categories
+            "nwords": len(words),
+            "data": variable_list  # Emotion scores
         })
 
-    # Convert the result into JSON
-    return json.dumps(result, indent=4)
+    return result
+
+# Function to look the texts up in the result cache. Returns their rows, whose data is None when the
+# text still has to be scored, and {key: positions} of those texts: a text repeated in the batch is
+# scored once. The emotion scores only depend on the lowercased words, the VADER scores (and the spaCy
+# lemmas) also on their case.
+def cache_lookup(text_list, categories=None, vader=False):
+    categories = tuple(resolve_categories(categories))
+    rows = []
+    misses = {}
+    for position, text in enumerate(text_list):
+        text = SMART_QUOTES.sub("'", text)
+        words = text.split()
+        normalized = " ".join(words)
+        key = (normalized if vader or lemmatizer == "spacy" else normalized.lower(), categories, vader)
+        data = None if key in misses else result_cache.get(key)
+        if data is None:
+            misses.setdefault(key, []).append(position)
+        rows.append({"sentence": text, "nwords": len(words), "data": None if data is None else list(data)})
+    return rows, misses
+
+# Function to fill in the rows of the texts that missed the cache with their scored rows, and cache them
+def cache_store(rows, misses, scored):
+    for (key, positions), row in zip(misses.items(), scored):
+        result_cache.put(key, tuple(row["data"]))
+        for position in positions:
+            rows[position]["data"] = list(row["data"])
+    return rows
+
+# Function to score a list of texts into rows like score_text_rows, reusing cached results
+def score_cached_rows(text_list, categories=None, vectorize=None, vader=False):
+    rows, misses = cache_lookup(text_list, categories, vader)
+    if misses:
+        pending = [text_list[positions[0]] for positions in misses.values()]
+        cache_store(rows, misses, score_text_rows(pending, categories, vectorize, vader))
+    return rows
+
+# Function to list the headers that describe the data of every result
+def result_headers(categories=None, vader=False):
+    return ["nwords"] + [category_header(key) for key in resolve_categories(categories)] + \
+        (VADER_HEADERS if vader else [])
+
+# Function to turn a category selection into GI keys. None selects the NRC emotions, "all" selects
+# every GI category, otherwise each entry may be a GI key (Hostile_GI, Positive_HuLiu), an output header (Anger_EmoLex),
+# a GALC category (Anger_GALC), an ANEW column (Valence_ANEW) or a SenticNet one (Polarity_SenticNet)
+def resolve_categories(categories):
+    if categories is None:
+        return NRC_CATEGORIES
+    GI_categories = registry.get("GI_categories")
+    if categories == "all":
+        return [key for key in GI_categories if key not in OPINION_SOURCES]
+    if isinstance(categories, str):
+        categories = [categories]
+    elif not isinstance(categories, (list, tuple)) or not all(isinstance(name, str) for name in categories):
+        raise ValueError("categories must be \"all\", a category name or a list of category names")
+
+    GI_category_ids = registry.get("GI_category_ids")
+    keys = []
+    for name in categories:
+        if name in GI_category_ids:
+            keys.append(GI_categories[GI_category_ids[name]])
+        elif (is_GALC_category(name) and name in registry.get("GALC_category_ids") or name in ANEW_CATEGORIES or
+              name in SENTICNET_CATEGORIES):
+            keys.append(name)
+        else:
+            raise ValueError("Unknown category: {!r}".format(name))
+    return keys
+
+# Function to tell the GALC categories (Anger_GALC) from the GI, Lasswell and NRC ones
+def is_GALC_category(key):
+    return key.endswith("_GALC")
+
+# Function to name the lexicon that scores a category: "GALC", "ANEW", "SenticNet" or "GI" (GI, Lasswell and NRC)
+def category_family(key):
+    if is_GALC_category(key):
+        return "GALC"
+    if key in ANEW_CATEGORIES:
+        return "ANEW"
+    if key in SENTICNET_CATEGORIES:
+        return "SenticNet"
+    return "GI"
+
+# Function to normalize a text and split it into its words (as written, for nwords and VADER)
+# and the lowercased word tokens that are scored against the lexicons
+def tokenize_text(text):
+    # Replace both types of smart quotes with straight quotes
+    text = SMART_QUOTES.sub("'", text)
+    words = text.split()
+
+    pre_text = text.lower().split()
+    # Remove punctuation from the start and end of each word
+    tokens = [word.strip(PUNCTUATION) for word in pre_text if word.strip(PUNCTUATION)]
+    return text, words, tokens
+
+# Function to score a whole batch of tokenized texts at once. The batch is turned into a sparse
+# document x term matrix (COO triplets) and multiplied by the term x category matrix, which gives
+# the category counts of every text in one vectorized operation.
+def score_batch(token_lists, categories=NRC_CATEGORIES):
+    GI_vocabulary_ids, GI_term_indptr, GI_term_categories = registry.get("GI_term_matrix")
+    GI_category_ids = registry.get("GI_category_ids")
+    ncategories = len(registry.get("GI_categories"))
+    nterms = len(GI_vocabulary_ids)
+
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+    get_term_id = GI_vocabulary_ids.get
+    term_ids = np.fromiter((get_term_id(word, -1) for tokens in token_lists for word in tokens),
+                           dtype=np.int64, count=int(lengths.sum()))
+    doc_ids = np.repeat(np.arange(len(token_lists), dtype=np.int64), lengths)
+
+    # Keep only the tokens that belong to at least one category
+    matched = term_ids >= 0
+    term_ids = term_ids[matched]
+    doc_ids = doc_ids[matched]
+
+    # Document x term matrix: one (doc, term, count) triplet per distinct pair
+    pairs, term_counts = np.unique(doc_ids * nterms + term_ids, return_counts=True)
+    doc_ids, term_ids = np.divmod(pairs, nterms)
+
+    # Sparse product with the term x category matrix: expand every triplet into its category row
+    starts = GI_term_indptr[term_ids].astype(np.int64)
+    row_lengths = GI_term_indptr[term_ids + 1].astype(np.int64) - starts
+    offsets = np.arange(int(row_lengths.sum()), dtype=np.int64) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+    category_ids = GI_term_categories[np.repeat(starts, row_lengths) + offsets]
+    counts = np.bincount(np.repeat(doc_ids, row_lengths) * ncategories + category_ids,
+                         weights=np.repeat(term_counts, row_lengths),
+                         minlength=len(token_lists) * ncategories).reshape(len(token_lists), ncategories)
+
+    selected = counts[:, [GI_category_ids[key] for key in categories]]
+    rows = []
+    for row, length in zip(selected, lengths.tolist()):
+        # Same result as safe_divide for every cell, including the integer 0 for empty texts
+        rows.append((row / length).tolist() if length else [0] * len(categories))
+    return rows
 
 # Function to calculate NRC scores for emotions
-def run_nrc(text, variable_list, header_list):
-    # List of emotions to analyze using NRC
-    emotions = ['Anger_NRC', 'Anticipation_NRC', 'Disgust_NRC', 'Fear_NRC', 'Joy_NRC',
-                'Negative_NRC', 'Positive_NRC', 'Sadness_NRC', 'Surprise_NRC', 'Trust_NRC']
+def run_nrc(text, variable_list, header_list, categories=NRC_CATEGORIES):
+    GI_category_ids = registry.get("GI_category_ids")
+    variable_list.extend(score_tokens(text, [GI_category_ids[key] for key in categories]))
+    header_list.extend(category_header(key) for key in categories)
+
+# Function to score one tokenized text: count every category in one pass over the tokens,
+# then report the frequency of the requested category ids
+def score_tokens(in_text, category_ids):
+    nwords = len(in_text)
+    if nwords == 0:
+        return [0] * len(category_ids)  # Same as safe_divide for an empty text
+    counts = count_categories(in_text)
+    return [counts[category_id] / nwords for category_id in category_ids]
+
+# Function to lemmatize texts with spaCy, in one nlp.pipe run over the whole batch. Every text is given
+# as its tokens (as written, without the punctuation) so that lemma i belongs to token i.
+def spacy_lemmas(word_lists):
+    from spacy.tokens import Doc
+
+    nlp = registry.get("nlp")
+    docs = (Doc(nlp.vocab, words=words) for words in word_lists)
+    return [[token.lemma_.lower() or token.lower_ for token in doc]
+            for doc in nlp.pipe(docs, batch_size=SPACY_BATCH_SIZE, n_process=SPACY_PROCESSES)]
+
+# Function to score tokenized texts with their spaCy lemmas: a token counts for a category when the
+# token itself or its lemma is listed there, as in ListDict_counter
+def score_lemmatized(token_lists, lemma_lists, category_ids):
+    get_word_categories = registry.get("GI_word_index").get
+    ncategories = len(registry.get("GI_categories"))
+    rows = []
+    for tokens, lemmas in zip(token_lists, lemma_lists):
+        if not tokens:
+            rows.append([0] * len(category_ids))  # Same as safe_divide for an empty text
+            continue
+        counts = [0] * ncategories
+        for token, lemma in zip(tokens, lemmas):
+            token_categories = get_word_categories(token, ())
+            if lemma != token:
+                token_categories = set(token_categories).union(get_word_categories(lemma, ()))
+            for category_id in token_categories:
+                counts[category_id] += 1
+        rows.append([counts[category_id] / len(tokens) for category_id in category_ids])
+    return rows
+
+# Function to count, for every GI category, how many words of the text fall into it
+def count_categories(in_text):
+    return registry.get("GI_index").count(in_text, [0] * len(registry.get("GI_categories")))
+
+
+# Function to add the GALC, ANEW and SenticNet columns to rows of GI scores, in the requested category order
+def add_family_scores(token_lists, categories, rows):
+    family_keys = {"GI": []}
+    positions = []  # (family, column in the rows of that family) of every requested category
+    for key in categories:
+        keys = family_keys.setdefault(category_family(key), [])
+        positions.append((category_family(key), len(keys)))
+        keys.append(key)
+
+    family_rows = []
+    for family, keys in family_keys.items():
+        if family == "GI":
+            family_rows.append(rows)
+        elif family == "GALC":
+            GALC_category_ids = registry.get("GALC_category_ids")
+            family_rows.append(score_GALC(token_lists, [GALC_category_ids[key] for key in keys]))
+        elif family == "ANEW":
+            family_rows.append(score_ANEW(token_lists, keys))
+        else:
+            family_rows.append(score_SenticNet(token_lists, keys))
+
+    # Concatenate the rows of every text family by family, then reorder them unless the request already
+    # lists its categories family by family
+    offsets = dict(zip(family_keys, accumulate([0] + [len(keys) for keys in family_keys.values()])))
+    order = [offsets[family] + column for family, column in positions]
+    combined = [list(chain.from_iterable(parts)) for parts in zip(*family_rows)]
+    if order == sorted(order):
+        return combined
+    return [[row[position] for position in order] for row in combined]
+
+# Function to score tokenized texts against GALC category ids: for every category, the frequency of
+# the words matching one of its patterns (a word counts once per category)
+def score_GALC(token_lists, category_ids):
+    index = registry.get("GALC_index")
+    ncategories = len(registry.get("GALC_categories"))
+    rows = []
+    for tokens in token_lists:
+        if not tokens:
+            rows.append([0] * len(category_ids))  # Same as safe_divide for an empty text
+            continue
+        counts = [0] * ncategories
+        for token in tokens:
+            for category_id in match_wildcards(index, token):
+                counts[category_id] += 1
+        rows.append([counts[category_id] / len(tokens) for category_id in category_ids])
+    return rows
+
+# Function to score a batch of tokenized texts against the ANEW norms: every token becomes a word id
+# (-1 if unrated), and the norms of the rated tokens are summed per text with one bincount per dimension
+def score_ANEW(token_lists, categories=ANEW_CATEGORIES):
+    ANEW_index, ANEW_matrix = registry.get("ANEW_index")
+    ntexts = len(token_lists)
+
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=ntexts)
+    get_word_id = ANEW_index.get
+    word_ids = np.fromiter((get_word_id(word, -1) for tokens in token_lists for word in tokens),
+                           dtype=np.int64, count=int(lengths.sum()))
+    doc_ids = np.repeat(np.arange(ntexts, dtype=np.int64), lengths)
+    matched = word_ids >= 0
+    word_ids = word_ids[matched]
+    doc_ids = doc_ids[matched]
+
+    coverage = np.bincount(doc_ids, minlength=ntexts)
+    sums = np.stack([np.bincount(doc_ids, weights=ANEW_matrix[word_ids, dimension], minlength=ntexts)
+                     for dimension in range(3)], axis=1)  # Exact: integer hundredths
+    # Means over the rated words (0.0 when there are none), then the sums over all words
+    scores = np.hstack([sums / np.maximum(coverage, 1)[:, None], sums / np.maximum(lengths, 1)[:, None]]) / 100
+    selected = scores[:, [ANEW_CATEGORIES.index(key) for key in categories]]
+
+    rows = []
+    for row, length in zip(selected.tolist(), lengths.tolist()):
+        rows.append(row if length else [0] * len(categories))  # Same as safe_divide for an empty text
+    return rows
+
+# Function to score a batch of tokenized texts against SenticNet: the concepts found in every text are
+# gathered into one concept id array and their dimensions summed per text with one bincount each
+def score_SenticNet(token_lists, categories=SENTICNET_CATEGORIES):
+    SenticNet_root, SenticNet_matrix = registry.get("SenticNet_index")
+    ntexts = len(token_lists)
+
+    concept_lists = [match_concepts(SenticNet_root, tokens) for tokens in token_lists]
+    nconcepts = np.fromiter((len(concept_ids) for concept_ids in concept_lists), dtype=np.int64, count=ntexts)
+    concept_ids = np.fromiter(chain.from_iterable(concept_lists), dtype=np.int64, count=int(nconcepts.sum()))
+    doc_ids = np.repeat(np.arange(ntexts, dtype=np.int64), nconcepts)
+
+    columns = [SENTICNET_CATEGORIES.index(key) for key in categories]
+    sums = np.stack([np.bincount(doc_ids, weights=SenticNet_matrix[concept_ids, column], minlength=ntexts)
+                     for column in columns], axis=1).reshape(ntexts, len(columns))  # Exact: integer thousandths
+    # Means over the concepts found (0.0 when there are none)
+    means = sums / np.maximum(nconcepts, 1)[:, None] / 1000
+
+    rows = []
+    for row, tokens in zip(means.tolist(), token_lists):
+        rows.append(row if tokens else [0] * len(categories))  # Same as safe_divide for an empty text
+    return rows
 
-    # Calculate frequency of each emotion in the text
-    for emotion in emotions:
-        ListDict_counter(GI_dict, emotion, text, variable_list, header_list)
 
 # Function to count occurrences of words in GI_dict and calculate their frequency
 def ListDict_counter(list_dict, key, in_text, variable_list, header_list):
     # Count how many words in the text match the words in the GI dictionary
+    lemma_dict = registry.get("lemma_dict")
     counter = sum(1 for word in in_text if word in list_dict[key] or lemma_dict.get(word) in list_dict[key])
 
     # Safely divide the count by the number of words to get frequency
@@ -261,10 +978,186 @@ async def process_texts(request: Request):
     try:
         data = await request.json()
         text_list = data.get("text_list", [])
-        output_json = process_text_list(text_list)
-        return JSONResponse(content=json.loads(output_json))
+        categories = data.get("categories")  # Optional: list of category names or "all"
+        vader = data.get("vader", False)  # Optional: append the VADER valence columns
+        if not isinstance(vader, bool):
+            raise ValueError("vader must be true or false, not {!r}".format(vader))
+        # Optional response shape: "records", "compact" or "columnar", the columnar scores can be
+        # encoded as "json", "base64" or "binary" (also selected by Accept: application/octet-stream)
+        if "application/octet-stream" in request.headers.get("accept", ""):
+            response_format = data.get("format", "columnar")
+            encoding = data.get("encoding", "binary")
+        else:
+            response_format = data.get("format", "records")
+            encoding = data.get("encoding", "json")
+        header_list = result_headers(categories, vader)  # Rejects unknown categories before any work is scheduled
+        validate_format(response_format, encoding)
+        # Score off the event loop so that a large batch does not block other requests
+        rows = await score_rows(text_list, categories, vader)
+        # Serialize the structured results exactly once
+        return build_response(rows, header_list, response_format, encoding)
     except ValidationError as e:
         return JSONResponse(status_code=422, content={"detail": e.errors()})
+    except ValueError as e:
+        return JSONResponse(status_code=422, content={"detail": str(e)})
+    except BrokenProcessPool:
+        # The batch broke a fresh worker pool as well (see ScoringExecutor.map)
+        return JSONResponse(status_code=503, content={"detail": "scoring workers unavailable, retry later"})
+
+# Function to score texts off the event loop: cached rows are reused and only the other texts go to the executor
+async def score_rows(text_list, categories=None, vader=False):
+    rows, misses = cache_lookup(text_list, categories, vader)
+    if misses:
+        pending = [text_list[positions[0]] for positions in misses.values()]
+        cache_store(rows, misses, await scoring_executor.map(score_text_rows, pending, categories=categories,
+                                                             vader=vader))
+    return rows
+
+# Streaming variant of /Emotion-Analysis/ for very large corpora. The body holds one text per line:
+# raw lines for text/plain, or NDJSON (a JSON string or {"text": ...} per line) for application/x-ndjson.
+# Texts are read incrementally, scored in chunks of chunk_size and streamed back as NDJSON, one result
+# per line in input order. Query parameters: categories (comma-separated names or "all"),
+# format ("records", or "compact" for a first {"headers": [...]} line and rows without headers),
+# chunk_size and vader (append the VADER valence columns).
+@app.post("/Emotion-Analysis/stream")
+async def stream_texts(request: Request, categories: str = None, format: str = "records", chunk_size: int = 1000,
+                       vader: bool = False):
+    try:
+        if categories is not None and categories != "all":
+            categories = [name.strip() for name in categories.split(",") if name.strip()]
+        header_list = result_headers(categories, vader)
+        if format not in ("records", "compact"):
+            raise ValueError("Unknown stream format: {!r} (expected records or compact)".format(format))
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+    except ValueError as e:
+        return JSONResponse(status_code=422, content={"detail": str(e)})
+
+    json_lines = request.headers.get("content-type", "").startswith(("application/x-ndjson", "application/json"))
+    return NDJSONStreamingResponse(stream_results(request, categories, header_list, format, chunk_size, json_lines,
+                                                  vader))
+
+# Function to split the request body into lines as it arrives
+async def iter_request_lines(request):
+    pending = []  # Pieces of the line that continues in the next chunk; only new chunks are searched
+    async for chunk in request.stream():
+        *lines, rest = chunk.split(b"\n")
+        if lines:
+            pending.append(lines[0])
+            lines[0] = b"".join(pending)
+            pending = []
+        for line in lines:
+            yield line
+        if rest:
+            pending.append(rest)
+    if pending:
+        yield b"".join(pending)
+
+# Async generator behind /Emotion-Analysis/stream: at most one chunk of texts is held at a time
+async def stream_results(request, categories, header_list, response_format, chunk_size, json_lines, vader=False):
+    if response_format == "compact":
+        yield dumps_lines([{"headers": header_list}])
+
+    chunk = []
+    line_number = 0
+    async for line in iter_request_lines(request):
+        line_number += 1
+        try:
+            line = line.decode("utf-8").rstrip("\r")
+            if json_lines:
+                if not line.strip():
+                    continue  # NDJSON allows blank lines
+                text = json.loads(line)
+                if isinstance(text, dict):
+                    text = text["text"]
+                if not isinstance(text, str):
+                    raise ValueError("expected a string")
+            else:
+                text = line
+        except (ValueError, KeyError) as e:  # UnicodeDecodeError is a ValueError
+            # The status line is already sent, so flush what was read and report the error in-band
+            if chunk:
+                yield await score_chunk(chunk, categories, header_list, response_format, vader)
+            yield dumps_lines([{"error": "Invalid input on line {}: {}".format(line_number, e)}])
+            return
+        chunk.append(text)
+
+        if len(chunk) >= chunk_size:
+            yield await score_chunk(chunk, categories, header_list, response_format, vader)
+            chunk = []
+
+    if chunk:
+        yield await score_chunk(chunk, categories, header_list, response_format, vader)
+
+async def score_chunk(chunk, categories, header_list, response_format, vader=False):
+    rows = await score_rows(chunk, categories, vader)
+    if response_format == "records":
+        for row in rows:
+            row["headers"] = header_list
+    return dumps_lines(rows)
+
+# Live scoring of a speech transcript over a WebSocket. Every text message holds the newly recognized
+# words, and every reply is the {"nwords", "data"} row of the sliding window after them (see streaming.py),
+# so the cost per word stays constant however long the session runs. The first message sent is
+# {"headers": [...]}. Query parameters: categories, vader, window_words (last N words) and
+# window_seconds (words of the last T seconds).
+@app.websocket("/Emotion-Analysis/live")
+async def live_scores(websocket: WebSocket, categories: str = None, vader: bool = False, window_words: int = None,
+                      window_seconds: float = None):
+    from streaming import StreamingScorer
+
+    await websocket.accept()
+    if categories is not None and categories != "all":
+        categories = [name.strip() for name in categories.split(",") if name.strip()]
+    try:
+        scorer = StreamingScorer(categories, vader, window_words, window_seconds)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.send_text(dumps({"headers": scorer.headers}).decode("utf-8"))
+    async for text in websocket.iter_text():
+        await websocket.send_text(dumps(scorer.append(text)).decode("utf-8"))
+
+# Lists the category names that can be requested from /Emotion-Analysis/
+@app.get("/Emotion-Categories/")
+async def list_categories():
+    return {"categories": [category_header(key) for key in registry.get("GI_categories")] +
+            registry.get("GALC_categories") + ANEW_CATEGORIES + SENTICNET_CATEGORIES}
+
+# Reports executor queue depth and per-shard timings
+@app.get("/Executor-Metrics/")
+async def executor_metrics():
+    return scoring_executor.metrics()
+
+# Reports the result cache size and its hit, miss, eviction and expiration counters
+@app.get("/Cache-Metrics/")
+async def cache_metrics():
+    return result_cache.metrics()
+
+# Reports, for every lexicon and model, whether it is loaded, its load time and (with
+# SPEAKBRIGHT_TRACK_MEMORY=1) its memory
+@app.get("/Resources/")
+async def resource_stats():
+    return registry.stats()
+
+# Optional eager loading at startup: SPEAKBRIGHT_WARMUP=1 loads the scoring lexicons,
+# "all" loads every registered resource, or give a comma-separated list of resource names
+@app.on_event("startup")
+async def warm_up_resources():
+    names = os.environ.get("SPEAKBRIGHT_WARMUP", "").strip()
+    if not names or names == "0":
+        return
+    if names == "1":
+        warm_up()
+    elif names == "all":
+        registry.warm_up()
+    else:
+        warm_up([name.strip() for name in names.split(",") if name.strip()])
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    scoring_executor.shutdown(wait=False)
 
 # Test function
 def test_process_text_list():
@@ -283,6 +1176,10 @@ def test_process_text_list():
     print("JSON file created")
 
 
-test_process_text_list()
+if __name__ == "__main__":
+    if "--compile-lexicons" in sys.argv[1:]:
+        compile_lexicons()
+    else:
+        test_process_text_list()
 
 # *********************************************************************************************** #
\ No newline at end of file
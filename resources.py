@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+import tracemalloc
+
+
+class ResourceRegistry(object):
+    """
+    Registry of named resources (lexicons, lookup tables, NLP models) that are
+    loaded lazily on first use, or eagerly through warm_up(). With track_memory
+    every load runs under tracemalloc to measure what it keeps allocated, which
+    makes loading several times slower.
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self._loaders = {}
+        self._requires = {}
+        self._resources = {}
+        self._stats = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, name):
+        return name in self._loaders
+
+    def register(self, name, loader, requires=()):
+        """
+        Register a loader for a resource. `loader` is called without arguments the
+        first time the resource is needed; the resources named in `requires` are
+        loaded before it so that their cost is not counted twice.
+        """
+        self._loaders[name] = loader
+        self._requires[name] = tuple(requires)
+
+    def get(self, name):
+        """
+        Return a resource, loading it (and what it requires) if needed
+        """
+        try:
+            return self._resources[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._resources:
+                self._load(name)
+            return self._resources[name]
+
+    def is_loaded(self, name):
+        return name in self._resources
+
+    def warm_up(self, names=None):
+        """
+        Eagerly load the given resources (all registered ones by default) and
+        return their load statistics
+        """
+        if names is None:
+            names = list(self._loaders)
+        for name in names:
+            self.get(name)
+        return self.stats()
+
+    def stats(self):
+        """
+        Return per-resource load statistics: whether it is loaded, how long the
+        load took in seconds and how many bytes it kept allocated (None unless memory is tracked)
+        """
+        return {name: dict(self._stats.get(name, {"loaded": False, "load_time": None, "memory": None}))
+                for name in self._loaders}
+
+    def _load(self, name):
+        if name not in self._loaders:
+            raise KeyError("Unknown resource: {!r}".format(name))
+        for required in self._requires[name]:
+            self.get(required)
+
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        start = time.perf_counter()
+        try:
+            resource = self._loaders[name]()
+        finally:
+            load_time = time.perf_counter() - start
+            memory = tracemalloc.get_traced_memory()[0] - memory_before if tracemalloc.is_tracing() else None
+            if started_tracing:
+                tracemalloc.stop()
+
+        self._resources[name] = resource
+        self._stats[name] = {"loaded": True, "load_time": load_time, "memory": memory}
+
+
+# Shared registry used by every scoring module. SPEAKBRIGHT_TRACK_MEMORY=1 measures the memory of every load.
+registry = ResourceRegistry(track_memory=os.environ.get("SPEAKBRIGHT_TRACK_MEMORY", "") not in ("", "0"))
@@ -0,0 +1,115 @@
+import base64
+import json
+
+import numpy as np
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder produces the same JSON
+    orjson = None
+
+
+# Function to serialize results to compact UTF-8 JSON bytes, with orjson when it is installed
+def dumps(content):
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that serializes its content exactly once, through dumps()
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streams newline-delimited JSON. Unlike StreamingResponse it does not listen
+    for disconnects while streaming: the body generator reads the request body
+    itself, and receive() must not be consumed by two tasks at once. Backpressure
+    comes from awaiting send() for every chunk.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+# Function to encode rows as NDJSON: one JSON document per line
+def dumps_lines(rows):
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+RESPONSE_FORMATS = ("records", "compact", "columnar")
+# Encodings of the columnar score matrix: nested JSON lists, base64 float32 in the JSON body,
+# or the raw float32 matrix as an application/octet-stream body. Both float32 encodings carry the
+# same n x len(headers) matrix: column 0 is nwords and the other columns follow the headers.
+COLUMNAR_ENCODINGS = ("json", "base64", "binary")
+
+
+# Function to reject unknown response shapes before any scoring is scheduled
+def validate_format(response_format="records", encoding="json"):
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError("Unknown response format: {!r} (expected one of {})".format(
+            response_format, ", ".join(RESPONSE_FORMATS)))
+    if encoding not in COLUMNAR_ENCODINGS:
+        raise ValueError("Unknown encoding: {!r} (expected one of {})".format(
+            encoding, ", ".join(COLUMNAR_ENCODINGS)))
+    if encoding != "json" and response_format != "columnar":
+        raise ValueError("The {!r} encoding is only available for the columnar format".format(encoding))
+
+
+# Function to shape per-text rows ({"sentence", "nwords", "data"}) for the response.
+# "records" repeats the headers in every row, "compact" sends them once per response and
+# "columnar" sends one headers array, one nwords array and the scores as a row-major matrix. With the
+# "json" encoding the matrix holds the scores only; the float32 matrix of "base64" has one column per
+# header, nwords first, like the "binary" body.
+def format_results(rows, header_list, response_format="records", encoding="json"):
+    validate_format(response_format, encoding)
+    if response_format == "records":
+        for row in rows:
+            row["headers"] = header_list
+        return rows
+    if response_format == "compact":
+        return {"headers": header_list, "results": rows}
+
+    columns = {
+        "headers": header_list,
+        "sentences": [row["sentence"] for row in rows],
+        "nwords": [row["nwords"] for row in rows],
+    }
+    if encoding == "json":
+        columns["data"] = [row["data"] for row in rows]
+    else:
+        matrix = score_matrix(rows, len(header_list) - 1)
+        columns["data"] = {"dtype": "<f4", "shape": list(matrix.shape),
+                           "base64": base64.b64encode(matrix.tobytes()).decode("ascii")}
+    return columns
+
+# Function to pack all rows into one row-major little-endian float32 matrix: nwords in column 0,
+# then the ncolumns scores
+def score_matrix(rows, ncolumns):
+    matrix = np.empty((len(rows), ncolumns + 1), dtype="<f4")
+    for i, row in enumerate(rows):
+        matrix[i, 0] = row["nwords"]
+        matrix[i, 1:] = row["data"]
+    return matrix
+
+# Function to build the HTTP response for scored rows in the requested shape
+def build_response(rows, header_list, response_format="records", encoding="json"):
+    if response_format == "columnar" and encoding == "binary":
+        validate_format(response_format, encoding)
+        # Same matrix as the base64 encoding (X-Columns are the headers, nwords first); load with
+        # numpy.frombuffer(body, "<f4").reshape(X-Shape)
+        matrix = score_matrix(rows, len(header_list) - 1)
+        return Response(matrix.tobytes(), media_type="application/octet-stream", headers={
+            "X-Columns": ",".join(header_list),
+            "X-Shape": "{},{}".format(*matrix.shape),
+            "X-Dtype": "<f4",
+        })
+    return FastJSONResponse(content=format_results(rows, header_list, response_format, encoding))
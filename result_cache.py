@@ -0,0 +1,115 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+FLOAT_SIZE = sys.getsizeof(0.0)
+
+
+def _entry_size(key, value):
+    # Approximate bytes held by one entry: the key and the strings in it, the value tuple and its
+    # (float) items. Other parts of a key, such as the category selection, are shared between entries.
+    size = sys.getsizeof(key) + sys.getsizeof(value) + FLOAT_SIZE * len(value)
+    if isinstance(key, tuple):
+        size += sum(sys.getsizeof(part) for part in key if isinstance(part, str))
+    return size
+
+
+class ResultCache(object):
+    """
+    Bounded cache of scoring results, in least recently used order. An entry
+    is evicted when the cache holds more than `maxsize` entries or more than
+    `max_bytes` (approximate) bytes, and expires `ttl` seconds after it was
+    stored. Values are tuples, keys are any hashable objects.
+    """
+
+    def __init__(self, maxsize=10000, ttl=None, max_bytes=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (value, size, expiry time or None)
+        self._lock = threading.Lock()
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= self.clock():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        size = _entry_size(key, value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            expiry = self.clock() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, size, expiry)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def metrics(self):
+        """
+        Return the size of the cache and its hit, miss, eviction and expiration counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def cache_from_env():
+    """
+    Build a cache configured by SPEAKBRIGHT_CACHE_SIZE (entries, 0 disables the cache),
+    SPEAKBRIGHT_CACHE_TTL (seconds) and SPEAKBRIGHT_CACHE_BYTES
+    """
+    ttl = os.environ.get("SPEAKBRIGHT_CACHE_TTL")
+    max_bytes = os.environ.get("SPEAKBRIGHT_CACHE_BYTES", 64 * 1024 * 1024)
+    return ResultCache(maxsize=int(os.environ.get("SPEAKBRIGHT_CACHE_SIZE", 10000)),
+                       ttl=float(ttl) if ttl else None,
+                       max_bytes=int(max_bytes) if max_bytes else None)
@@ -0,0 +1,468 @@
+"""
+Incremental scoring of live speech transcripts.
+
+A StreamingScorer keeps a sliding window over the words recognized so far
+(the last `window_words` words and/or the words of the last `window_seconds`
+seconds) together with running totals for it, so appending a word and reading
+the scores cost amortized O(1) instead of rescoring the growing transcript:
+
+    scorer = StreamingScorer(vader=True, window_words=200)
+    for word in recognized_words:
+        row = scorer.append(word)
+
+Every row is what score_text_rows returns for the text of the window
+({"nwords", "data"}, without the sentence), under result_headers(categories, vader).
+SenticNet concepts are matched leftmost-longest like match_concepts: appending
+a word redoes the matches whose trie walk reached the end of the window,
+evicting one redoes the matches from the new first word until they line up
+with the old ones again, usually after a concept or two.
+
+The VADER valence of a token depends on the three tokens before it, on the two
+after it (idioms, "kind of") and on whether the window mixes ALL CAPS and other
+words. Every token keeps its valence for both cap states; appending a token
+rescores the last three tokens, evicting rescores the first three. Valences are
+summed as exact integers, separately before and after the first "but" (the
+"but" rule scales them by 0.5 and 1.5), so the totals never drift however long
+the session runs. polarity_scores sums floats in token order instead, which
+can round a score that falls on a tie (0.4375 -> 0.437 or 0.438), or tip a sum
+that cancels out, either way. When a score computed from the exact totals is
+that close to a rounding boundary or to a sign change, the window is rescored
+once through score_valence, so the scores always equal polarity_scores of the
+window text.
+"""
+import math
+import time
+from collections import deque
+from itertools import islice
+
+import main
+from data_files.vaderSentiment import BOOSTER_DICT, SentiText, normalize
+
+# Valences are summed as integers in units of 2**-VALENCE_BITS
+VALENCE_BITS = 80
+# Tokens before and after a token that its VADER valence depends on
+VADER_CONTEXT = (3, 2)
+# Distance (in units of the last rounded digit) within which the float sums of polarity_scores may
+# round or compare differently from the exact totals
+ROUNDING_TOLERANCE = 1e-6
+
+
+def _trie_depth(root):
+    # Number of tokens of the longest path through a token trie
+    depth, nodes = 0, [(root, 0)]
+    while nodes:
+        node, node_depth = nodes.pop()
+        depth = max(depth, node_depth)
+        nodes.extend((child, node_depth + 1) for token, child in node.items() if token is not None)
+    return depth
+
+
+class _TokenContext(object):
+    # The SentiText attributes read by SentimentIntensityAnalyzer._valence, over the tokens around one token
+    __slots__ = ("words_and_emoticons", "words_and_emoticons_lower", "is_cap_diff")
+
+    def __init__(self, words, words_lower, is_cap_diff):
+        self.words_and_emoticons = words
+        self.words_and_emoticons_lower = words_lower
+        self.is_cap_diff = is_cap_diff
+
+
+class StreamingScorer(object):
+    """
+    Emotion (and optionally VADER) scores of a sliding window over a live
+    transcript. Words are appended as they are recognized; the window keeps
+    the last `window_words` words and/or the words whose timestamp is within
+    `window_seconds` of the latest one. Without either limit the window is the
+    whole session.
+    """
+
+    def __init__(self, categories=None, vader=False, window_words=None, window_seconds=None, clock=time.monotonic):
+        if window_words is not None and window_words < 1:
+            raise ValueError("window_words must be positive")
+        if window_seconds is not None and window_seconds <= 0:
+            raise ValueError("window_seconds must be positive")
+        self.categories = main.resolve_categories(categories)
+        self.headers = main.result_headers(self.categories, vader)
+        self.vader = vader
+        self.window_words = window_words
+        self.window_seconds = window_seconds
+        self.clock = clock
+
+        # GI and GALC category id -> positions in the output (a category may be requested twice),
+        # and (position, column) of the ANEW and SenticNet columns
+        self._positions = {}
+        self._GALC_positions = {}
+        self._ANEW_columns = []
+        self._SenticNet_columns = []
+        for position, key in enumerate(self.categories):
+            family = main.category_family(key)
+            if family == "GALC":
+                self._GALC_positions.setdefault(main.registry.get("GALC_category_ids")[key], []).append(position)
+            elif family == "ANEW":
+                self._ANEW_columns.append((position, main.ANEW_CATEGORIES.index(key)))
+            elif family == "SenticNet":
+                self._SenticNet_columns.append((position, main.SENTICNET_CATEGORIES.index(key)))
+            else:
+                self._positions.setdefault(main.registry.get("GI_category_ids")[key], []).append(position)
+        self._index = main.registry.get("GI_index")
+        self._GALC_index = main.registry.get("GALC_index") if self._GALC_positions else None
+        self._ANEW_index = main.registry.get("ANEW_index") if self._ANEW_columns else None
+        if self._SenticNet_columns:
+            self._SenticNet_root, self._SenticNet_matrix = main.registry.get("SenticNet_index")
+            self._max_concept_words = _trie_depth(self._SenticNet_root)
+        self._analyzer = main.registry.get("vader_analyzer") if vader else None
+        self.reset()
+
+    def reset(self):
+        """
+        Empty the window, e.g. at the start of a new session
+        """
+        # (timestamp, category positions or None, ANEW norms or None, VADER token count, "!" count, "?" count) per word
+        self._words = deque()
+        self._counts = [0] * len(self.categories)
+        self._ntokens = 0
+        # Sums of the ANEW norms of the rated words, in hundredths like score_ANEW, and their count
+        self._norm_sums = [0, 0, 0]
+        self._nrated = 0
+        # SenticNet state: the tokens of the window, numbered from the start of the session, and its matches
+        self._tokens = deque()
+        self._first_token = 0  # number of the first token of the window
+        # (start, end, concept id or None, open) covering the tokens: None where nothing matched, open when
+        # the trie walk from start reached the end of the window, so that the next token may change the match
+        self._concepts = deque()
+        self._concept_sums = [0] * len(main.SENTICNET_CATEGORIES)  # in thousandths, like score_SenticNet
+        self._nconcepts = 0
+
+        # VADER state: one entry per token of the window; tokens are numbered from the start of the session
+        self._vader_words = deque()
+        self._vader_lower = deque()
+        self._valences = deque()  # (valence, valence when the window mixes ALL CAPS words)
+        self._first = 0  # number of the first token of the window
+        self._buts = deque()  # numbers of the "but" tokens
+        self._allcaps = 0
+        self._exclamations = 0
+        self._questions = 0
+        # [side][cap state] -> [positive sum, positive count, negative sum, negative count, neutral count],
+        # side 0 is up to the first "but" (or everything), side 1 after it
+        self._sums = [[[0, 0, 0, 0, 0] for _ in range(2)] for _ in range(2)]
+
+    def __len__(self):
+        return len(self._words)
+
+    def append(self, text, timestamp=None):
+        """
+        Append recognized text (one or more words) and return the scores of the window.
+        `timestamp` defaults to clock() and is what window_seconds is measured against.
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        for word in main.SMART_QUOTES.sub("'", text).split():
+            self._append_word(word, timestamp)
+            if self.window_words is not None and len(self._words) > self.window_words:
+                self._evict()
+        return self.expire(timestamp)
+
+    def expire(self, now=None):
+        """
+        Drop the words older than window_seconds at `now` (default clock()) and return the scores
+        """
+        if self.window_seconds is not None:
+            if now is None:
+                now = self.clock()
+            cutoff = now - self.window_seconds
+            while self._words and self._words[0][0] < cutoff:
+                self._evict()
+        return self.scores()
+
+    def scores(self):
+        """
+        Return the {"nwords", "data"} row of the window, as score_text_rows would
+        """
+        if self._ntokens:
+            data = [count / self._ntokens for count in self._counts]
+            for position, column in self._ANEW_columns:
+                # Means over the rated words, then the sums over all words, as score_ANEW computes them
+                denominator = max(self._nrated, 1) if column < 3 else self._ntokens
+                data[position] = self._norm_sums[column % 3] / denominator / 100
+            for position, column in self._SenticNet_columns:
+                # Means over the concepts found, as score_SenticNet computes them
+                data[position] = self._concept_sums[column] / max(self._nconcepts, 1) / 1000
+        else:
+            data = [0] * len(self._counts)  # Same as safe_divide for an empty text
+        if self.vader:
+            data.extend(self._vader_scores())
+        return {"nwords": len(self._words), "data": data}
+
+    def _append_word(self, word, timestamp):
+        positions = norms = None
+        token = word.lower().strip(main.PUNCTUATION)
+        if token:
+            positions = [position for category_id in self._index.get(token, ())
+                         for position in self._positions.get(category_id, ())]
+            if self._GALC_index is not None:
+                positions.extend(position for category_id in main.match_wildcards(self._GALC_index, token)
+                                 for position in self._GALC_positions.get(category_id, ()))
+            for position in positions:
+                self._counts[position] += 1
+            self._ntokens += 1
+            if self._SenticNet_columns:
+                self._append_concept_token(token)
+            if self._ANEW_index is not None:
+                ANEW_index, ANEW_matrix = self._ANEW_index
+                word_id = ANEW_index.get(token)
+                if word_id is not None:
+                    norms = ANEW_matrix[word_id].tolist()
+                    self._add_norms(norms, 1)
+
+        ntokens = exclamations = questions = 0
+        if self._analyzer is not None:
+            # Same tokens as SentiText of the window text, with emojis replaced by their descriptions
+            text = self._analyzer.emoji_matcher.replace(word)
+            exclamations, questions = text.count("!"), text.count("?")
+            for vader_word in text.split():
+                if len(vader_word) > 1:
+                    self._append_token(SentiText._strip_punc(vader_word))
+                    ntokens += 1
+            self._exclamations += exclamations
+            self._questions += questions
+        self._words.append((timestamp, positions, norms, ntokens, exclamations, questions))
+
+    def _evict(self):
+        _, positions, norms, ntokens, exclamations, questions = self._words.popleft()
+        if positions is not None:
+            for position in positions:
+                self._counts[position] -= 1
+            self._ntokens -= 1
+            if self._SenticNet_columns:
+                self._evict_concept_token()
+        if norms is not None:
+            self._add_norms(norms, -1)
+        self._exclamations -= exclamations
+        self._questions -= questions
+        if ntokens:
+            for _ in range(ntokens):
+                self._evict_token()
+            # The first tokens lost part of what precedes them
+            for i in range(min(VADER_CONTEXT[0], len(self._valences))):
+                self._rescore(i)
+
+    def _add_norms(self, norms, sign):
+        for dimension, norm in enumerate(norms):
+            self._norm_sums[dimension] += sign * norm
+        self._nrated += sign
+
+    # SenticNet concepts
+
+    def _append_concept_token(self, token):
+        end = self._first_token + len(self._tokens)
+        self._tokens.append(token)
+        # Redo the matches from the first open one: only their walks reach the new token, and a walk
+        # is at most _max_concept_words tokens long
+        redo = 0
+        for i, concept in enumerate(reversed(self._concepts)):
+            if concept[0] < end - self._max_concept_words:
+                break
+            if concept[3]:
+                redo = i + 1
+        for _ in range(redo):
+            self._remove_concept(self._concepts.pop())
+        start = self._concepts[-1][1] if self._concepts else self._first_token
+        while start <= end:
+            concept = self._match_concept(start)
+            self._concepts.append(concept)
+            start = concept[1]
+
+    def _evict_concept_token(self):
+        self._tokens.popleft()
+        self._first_token += 1
+        self._remove_concept(self._concepts.popleft())
+        # Match again from the new first token until a match ends where an old one starts:
+        # from there on the old matches are what matching from the start would find
+        start, end = self._first_token, self._first_token + len(self._tokens)
+        matched = []
+        while start < end:
+            while self._concepts and self._concepts[0][0] < start:
+                self._remove_concept(self._concepts.popleft())
+            if self._concepts and self._concepts[0][0] == start:
+                break
+            concept = self._match_concept(start)
+            matched.append(concept)
+            start = concept[1]
+        self._concepts.extendleft(reversed(matched))
+
+    def _match_concept(self, start):
+        # main.match_concept over the window, also telling whether the walk reached its end
+        tokens, first = self._tokens, self._first_token
+        node, match, walk_open = self._SenticNet_root, None, True
+        for i in range(start - first, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                walk_open = False
+                break
+            if None in node:
+                match = (node[None], first + i + 1)
+        if walk_open and len(node) == (None in node):
+            walk_open = False  # The walk ended on a leaf: no longer concept starts with these tokens
+        if match is None:
+            return start, start + 1, None, walk_open
+        self._add_concept(match[0], 1)
+        return start, match[1], match[0], walk_open
+
+    def _remove_concept(self, concept):
+        if concept[2] is not None:
+            self._add_concept(concept[2], -1)
+
+    def _add_concept(self, concept_id, sign):
+        for column, value in enumerate(self._SenticNet_matrix[concept_id].tolist()):
+            self._concept_sums[column] += sign * value
+        self._nconcepts += sign
+
+    # VADER tokens
+
+    def _append_token(self, word):
+        number = self._first + len(self._valences)
+        lower = word.lower()
+        self._vader_words.append(word)
+        self._vader_lower.append(lower)
+        self._valences.append((0, 0))
+        if lower == "but":
+            self._buts.append(number)
+        self._add(self._side(number), (0, 0), 1)
+        if word.isupper():
+            self._allcaps += 1
+        count = len(self._valences)
+        self._rescore(count - 1)
+        # The tokens before it only change when the new token completes a phrase starting at one of them
+        start = max(0, count - VADER_CONTEXT[1] - 1)
+        tail = [self._vader_lower[i] for i in range(start, count)]
+        for phrase_start, length in self._analyzer.phrase_matcher.find(tail):
+            if phrase_start + length == len(tail) and phrase_start < len(tail) - 1:
+                self._rescore(start + phrase_start)
+
+    def _evict_token(self):
+        number = self._first
+        self._add(self._side(number), self._valences[0], -1)
+        self._valences.popleft()
+        self._vader_lower.popleft()
+        if self._vader_words.popleft().isupper():
+            self._allcaps -= 1
+        self._first += 1
+
+        if self._buts and self._buts[0] == number:
+            # The tokens up to the next "but" (all tokens if there is none) now precede the first "but"
+            count = self._buts[1] - self._first + 1 if len(self._buts) > 1 else None
+            moved = list(islice(self._valences, 0, count))
+            for valences in moved:
+                self._add(1, valences, -1)
+            self._buts.popleft()
+            for valences in moved:
+                self._add(0, valences, 1)
+
+    def _side(self, number):
+        return 1 if self._buts and number > self._buts[0] else 0
+
+    def _add(self, side, valences, sign):
+        for totals, valence in zip(self._sums[side], valences):
+            if valence > 0:
+                totals[0] += sign * int(valence * 2 ** VALENCE_BITS)
+                totals[1] += sign
+            elif valence < 0:
+                totals[2] += sign * int(valence * 2 ** VALENCE_BITS)
+                totals[3] += sign
+            else:
+                totals[4] += sign
+
+    def _rescore(self, i):
+        valences = self._token_valences(i)
+        if valences != self._valences[i]:
+            side = self._side(self._first + i)
+            self._add(side, self._valences[i], -1)
+            self._valences[i] = valences
+            self._add(side, valences, 1)
+
+    def _token_valences(self, i):
+        # The valence of token i (before the "but" rule) without and with the ALL CAPS emphasis,
+        # computed like _sentiments does on the tokens around it
+        analyzer = self._analyzer
+        lower = self._vader_lower[i]
+        if lower not in analyzer.lexicon or lower in BOOSTER_DICT:
+            return 0, 0
+        start = max(0, i - VADER_CONTEXT[0])
+        end = min(len(self._valences), i + VADER_CONTEXT[1] + 1)
+        words = [self._vader_words[j] for j in range(start, end)]
+        words_lower = [self._vader_lower[j] for j in range(start, end)]
+        i -= start
+        phrases = analyzer.phrase_matcher.find(words_lower)
+        if phrases.get((i, 2)) == "kind of":
+            return 0, 0
+        valence = analyzer._valence(_TokenContext(words, words_lower, False), words[i], i, phrases)
+        # Only the token and the boosters before it can be emphasized by ALL CAPS
+        if not any(word.isupper() for word in words[:i + 1]):
+            return valence, valence
+        return valence, analyzer._valence(_TokenContext(words, words_lower, True), words[i], i, phrases)
+
+    def _vader_scores(self):
+        # score_valence over the running totals, in VADER_HEADERS order
+        count = len(self._valences)
+        if not count:
+            return [0.0, 0.0, 0.0, 0.0]
+        cap = 1 if 0 < self._allcaps < count else 0
+        before, after = self._sums[0][cap], self._sums[1][cap]
+        if self._buts:
+            # The "but" rule: x0.5 up to the first "but", x1.5 after it
+            positive = (before[0] + 3 * after[0]) / 2 ** (VALENCE_BITS + 1)
+            negative = (before[2] + 3 * after[2]) / 2 ** (VALENCE_BITS + 1)
+            sum_s = (before[0] + before[2] + 3 * (after[0] + after[2])) / 2 ** (VALENCE_BITS + 1)
+        else:
+            positive = before[0] / 2 ** VALENCE_BITS
+            negative = before[2] / 2 ** VALENCE_BITS
+            sum_s = (before[0] + before[2]) / 2 ** VALENCE_BITS
+
+        # The float sums of polarity_scores can only take another sign decision below when a margin is this small
+        margin = abs(sum_s)
+
+        punct_emph_amplifier = self._analyzer._punctuation_emphasis(
+            "!" * min(self._exclamations, 4) + "?" * min(self._questions, 4))
+        if sum_s > 0:
+            sum_s += punct_emph_amplifier
+        elif sum_s < 0:
+            sum_s -= punct_emph_amplifier
+        compound = normalize(sum_s)
+
+        # Every positive valence counts 1 more, every negative one 1 less (see _sift_sentiment_scores)
+        pos_sum = positive + before[1] + after[1]
+        neg_sum = negative - before[3] - after[3]
+        neu_count = before[4] + after[4]
+        margin = min(margin, abs(pos_sum - math.fabs(neg_sum)))
+        if pos_sum > math.fabs(neg_sum):
+            pos_sum += punct_emph_amplifier
+        elif pos_sum < math.fabs(neg_sum):
+            neg_sum -= punct_emph_amplifier
+
+        total = pos_sum + math.fabs(neg_sum) + neu_count
+        neg, neu, pos = math.fabs(neg_sum / total), math.fabs(neu_count / total), math.fabs(pos_sum / total)
+        # Scores on a rounding tie, or a sign decision on a near-zero margin (only possible when some
+        # token has a valence), are left to the float sums in token order
+        if ((margin * 1000 < ROUNDING_TOLERANCE and before[1] + before[3] + after[1] + after[3]) or
+                abs(neg * 1000 % 1 - 0.5) < ROUNDING_TOLERANCE or abs(neu * 1000 % 1 - 0.5) < ROUNDING_TOLERANCE or
+                abs(pos * 1000 % 1 - 0.5) < ROUNDING_TOLERANCE or
+                abs(compound * 10000 % 1 - 0.5) < ROUNDING_TOLERANCE):
+            return self._vader_scores_in_order(cap)
+        return [round(neg, 3), round(neu, 3), round(pos, 3), round(compound, 4)]
+
+    def _vader_scores_in_order(self, cap):
+        # score_valence itself over the sentiments of the window in token order, as _sentiments and
+        # _but_check produce them (O(window), only for the scores the exact totals cannot round alone)
+        first_but = self._buts[0] - self._first if self._buts else len(self._valences)
+        sentiments = []
+        for i, valences in enumerate(self._valences):
+            sentiment = valences[cap]
+            if self._buts:
+                if i < first_but:
+                    sentiment = sentiment * 0.5
+                elif i > first_but:
+                    sentiment = sentiment * 1.5
+            sentiments.append(sentiment)
+        scores = self._analyzer.score_valence(sentiments, "!" * self._exclamations + "?" * self._questions)
+        return [scores["neg"], scores["neu"], scores["pos"], scores["compound"]]
+